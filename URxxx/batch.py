@@ -0,0 +1,60 @@
+from collections import namedtuple
+
+
+class BatchResult(namedtuple('BatchResult', 'expected actual')):
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        return self.expected == self.actual
+
+
+class ParameterBatch():
+    '''
+        Transactional write batch. Changes are queued with set() and go out back to back on
+        commit(), followed by one pipelined read that verifies all of them.
+
+            with ur44c.Batch() as batch:
+                batch.set(UR44C_Params_Mixer, 'InputMix1Volume', 103, 0)
+                batch.set(UR44C_Params_Mixer, 'InputMix1Pan', 0, 0)
+            if not batch.ok:
+                print(batch.failed())
+    '''
+
+    def __init__(self, device, window=16, check_timeout=3):
+        self.device = device
+        self.window = window
+        self.check_timeout = check_timeout
+        self.changes = []
+        self.report = {}
+
+
+    def set(self, unit, name, value, input=0):
+        self.changes.append((unit, name, value, input))
+
+
+    def commit(self):
+        '''
+            Returns {(unit, name, input): BatchResult(expected, actual)}.
+        '''
+        changes, self.changes = self.changes, []
+        self.report = self.device.SetParameters(changes, self.window, self.check_timeout)
+        return self.report
+
+
+    @property
+    def ok(self):
+        return all(result.ok for result in self.report.values())
+
+
+    def failed(self):
+        return {key: result for key, result in self.report.items() if not result.ok}
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
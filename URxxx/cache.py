@@ -0,0 +1,58 @@
+import threading
+import time
+
+
+class ParameterCache():
+    '''
+        In-memory mirror of device parameters keyed by (channel, param).
+        Every entry remembers when it was last seen, so readers can decide how fresh it has to be.
+        max_age=None means entries never expire on their own.
+    '''
+
+    def __init__(self, max_age=None):
+        self.max_age = max_age
+        self.entries = {}
+        self.lock = threading.Lock()
+
+
+    def update(self, channel, param, value, timestamp=None):
+        if timestamp is None:
+            timestamp = time.monotonic()
+        with self.lock:
+            self.entries[(channel, param)] = (value, timestamp)
+
+
+    def get(self, channel, param, max_age=None):
+        with self.lock:
+            entry = self.entries.get((channel, param))
+        if entry is None:
+            return None
+        value, timestamp = entry
+        if max_age is None:
+            max_age = self.max_age
+        if max_age is not None and time.monotonic() - timestamp > max_age:
+            return None
+        return value
+
+
+    def age(self, channel, param):
+        with self.lock:
+            entry = self.entries.get((channel, param))
+        if entry is None:
+            return None
+        return time.monotonic() - entry[1]
+
+
+    def invalidate(self, channel=None, param=None):
+        with self.lock:
+            if channel is None and param is None:
+                self.entries.clear()
+                return
+            for key in list(self.entries):
+                if (channel is None or key[0] == channel) and (param is None or key[1] == param):
+                    del self.entries[key]
+
+
+    def keys(self):
+        with self.lock:
+            return list(self.entries)
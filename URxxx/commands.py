@@ -0,0 +1,109 @@
+'''
+    Line based command language shared by `urcontrol --batch` and the daemon:
+
+        get UNIT NAME [INPUT]
+        set UNIT NAME (VALUE|min|max|def) [INPUT]
+        reset
+
+    INPUT is 1-based like the --input option and defaults to 1. Blank lines and lines
+    starting with # are ignored. Every command produces one result line: the value for get,
+    OK for set/reset, FAILED / TIMEOUT when the device didn't confirm, ERROR <reason> for
+    malformed commands.
+'''
+
+
+class CommandError(Exception):
+    pass
+
+
+def _target(device, words):
+    if len(words) < 2:
+        raise CommandError('expected UNIT NAME')
+    unit, name = words[0], words[1]
+    if unit not in device.registry.units:
+        raise CommandError(f'unknown unit {unit}')
+    try:
+        i = device.registry.index(unit, name)
+    except AttributeError:
+        raise CommandError(f'unknown parameter {name} in {unit}')
+    return unit, name, i
+
+
+def _input(device, words):
+    if not words:
+        return 0
+    try:
+        input = int(words[0]) - 1
+    except ValueError:
+        raise CommandError(f'bad input {words[0]}')
+    if not 0 <= input < device.num_inputs:
+        raise CommandError(f'input out of range 1-{device.num_inputs}')
+    return input
+
+
+def parse_value(registry, i, word):
+    attr = registry.describe(i)
+    if word == 'min':
+        return attr[1]
+    elif word == 'max':
+        return attr[2]
+    elif word == 'def':
+        if attr[3] is None:
+            raise CommandError('parameter has no default')
+        return attr[3]
+    try:
+        value = int(word)
+    except ValueError:
+        raise CommandError(f'bad value {word}')
+    if not attr[1] <= value <= attr[2]:
+        raise CommandError(f'value out of range {attr[1]}..{attr[2]}')
+    return value
+
+
+def execute(device, line):
+    '''
+        Run one command line. Returns the result line, or None for blank lines and comments.
+    '''
+    words = line.split()
+    if not words or words[0].startswith('#'):
+        return None
+    command = words[0]
+    try:
+        if command == 'get':
+            unit, name, i = _target(device, words[1:])
+            input = _input(device, words[3:4])
+            value = device.GetParameterByName(unit, name, input)
+            return 'TIMEOUT' if value is None else str(value)
+
+        elif command == 'set':
+            unit, name, i = _target(device, words[1:])
+            if len(words) < 4:
+                raise CommandError('expected UNIT NAME VALUE')
+            value = parse_value(device.registry, i, words[3])
+            input = _input(device, words[4:5])
+            return 'OK' if device.SetParameterByName(unit, name, value, input) else 'FAILED'
+
+        elif command == 'reset':
+            device.ResetConfig()
+            return 'OK'
+
+        raise CommandError(f'unknown command {command}')
+    except CommandError as e:
+        return f'ERROR {e}'
+
+
+def run(device, lines, output, execute=execute):
+    '''
+        Execute every line, streaming one result line per command to output.
+        Returns True when all commands succeeded.
+    '''
+    ok = True
+    for line in lines:
+        result = execute(device, line)
+        if result is None:
+            continue
+        if result.startswith(('ERROR', 'FAILED', 'TIMEOUT')):
+            ok = False
+        output.write(result + '\n')
+        output.flush()
+    return ok
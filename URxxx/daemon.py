@@ -0,0 +1,287 @@
+'''
+    Device daemon: one process owns the MIDI ports, local clients share it over a Unix socket.
+
+    The protocol is the command language of URxxx.commands, one request line gets exactly
+    one response line (UTF-8, undecodable bytes become U+FFFD):
+
+        get UNIT NAME [INPUT]                   -> VALUE | TIMEOUT | ERROR <reason>
+        set UNIT NAME (VALUE|min|max|def) [INPUT] -> OK | FAILED | ERROR <reason>
+        reset                                   -> OK
+        ping                                    -> OK
+        stats                                   -> DeviceStats.snapshot() as JSON | ERROR <reason>
+        subscribe                               -> OK, then events until the client disconnects:
+            change INPUT PARAM VALUE
+
+    Reads are answered from the parameter cache, which the device keeps current with its
+    change messages; only cold entries go to the wire. Writes of all clients go through
+    one WriteScheduler, so they are serialized and writes to the same parameter coalesce.
+'''
+
+import json
+import os
+import queue
+import select
+import socket
+import socketserver
+import stat
+import threading
+
+from URxxx import commands
+from URxxx import protocol
+from URxxx.scheduler import WriteScheduler
+
+
+class DaemonDevice():
+    '''
+        What the command handlers see: writes are queued on the scheduler and wait for
+        their confirmation, reset waits for queued writes first. Reads go straight to the
+        device, its request router lets any number of handler threads wait at once.
+    '''
+
+    def __init__(self, device, scheduler):
+        self.device = device
+        self.scheduler = scheduler
+
+
+    def __getattr__(self, name):
+        return getattr(self.device, name)
+
+
+    def SetParameterByName(self, unit, name, value, input=0):
+        return self.scheduler.set(unit, name, value, input).wait()
+
+
+    def ResetConfig(self, progress=None):
+        self.scheduler.flush()
+        stats = self.device.ResetConfig(progress)
+        self.device.InvalidateCache()
+        return stats
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        daemon = self.server.ur_daemon
+        for line in self.rfile:
+            line = line.decode('utf-8', 'replace').strip()
+            if line == 'subscribe':
+                self._reply('OK')
+                self._stream(daemon)
+                return
+            elif line == 'ping':
+                result = 'OK'
+            elif line == 'stats':
+                stats = daemon.device.stats
+                result = json.dumps(stats.snapshot()) if stats is not None else 'ERROR statistics are not enabled'
+            else:
+                try:
+                    result = commands.execute(daemon.session, line)
+                except Exception as e:
+                    result = f'ERROR {e}'
+                if result is None:
+                    continue
+            self._reply(result)
+
+
+    def _reply(self, line):
+        # an ERROR reply can echo back whatever the client sent
+        self.wfile.write(line.encode('utf-8', 'replace') + b'\n')
+        self.wfile.flush()
+
+
+    def _stream(self, daemon):
+        events = queue.Queue(daemon.queue_size)
+        daemon.subscribe(events)
+        try:
+            while daemon.running:
+                try:
+                    line = events.get(timeout=1)
+                except queue.Empty:
+                    # nothing to send, see whether the client went away
+                    readable, _, _ = select.select([self.connection], [], [], 0)
+                    if readable and not self.connection.recv(4096):
+                        return
+                    continue
+                self.wfile.write(line)
+                self.wfile.flush()
+        except OSError:
+            pass
+        finally:
+            daemon.unsubscribe(events)
+
+
+class Daemon():
+    '''
+        Serves a device on a Unix socket until close() is called.
+
+            daemon = Daemon(ur44c, '/tmp/urcontrol.sock')
+            daemon.serve_forever()
+    '''
+
+    def __init__(self, device, path, rate=50, queue_size=1000):
+        self.device = device
+        self.path = path
+        self.queue_size = queue_size
+        self.running = True
+        self.subscribers = set()
+        self.subscribers_lock = threading.Lock()
+
+        self.scheduler = WriteScheduler(device, rate)
+        self.session = DaemonDevice(device, self.scheduler)
+
+        device.EnableCache()
+        device.AddListener(self._on_message)
+
+        _remove_stale_socket(path)
+        self.server = socketserver.ThreadingUnixStreamServer(path, _Handler)
+        self.server.daemon_threads = True
+        self.server.ur_daemon = self
+
+
+    def _on_message(self, message):
+        # MIDI thread
+        if message.type not in ('change-parameter', 'reply-parameter'):
+            return
+        line = f'change {message.channel+1} {message.param} {message.value}\n'.encode('ascii')
+        with self.subscribers_lock:
+            subscribers = list(self.subscribers)
+        for events in subscribers:
+            try:
+                events.put_nowait(line)
+            except queue.Full:
+                # slow client, drop the event rather than stall the MIDI thread
+                pass
+
+
+    def subscribe(self, events):
+        with self.subscribers_lock:
+            self.subscribers.add(events)
+
+
+    def unsubscribe(self, events):
+        with self.subscribers_lock:
+            self.subscribers.discard(events)
+
+
+    def serve_forever(self):
+        self.server.serve_forever()
+
+
+    def close(self):
+        self.running = False
+        self.server.shutdown()
+        self.server.server_close()
+        self.scheduler.stop()
+        self.device.RemoveListener(self._on_message)
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def _remove_stale_socket(path):
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(f'{path} exists and is not a socket')
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except ConnectionRefusedError:
+        # left behind by a daemon that didn't shut down cleanly
+        os.unlink(path)
+        return
+    finally:
+        sock.close()
+    raise FileExistsError(f'A daemon is already serving {path}')
+
+
+class DaemonClient():
+    '''
+        Client side of the daemon protocol. Implements the by-name calls of UR44C so the
+        CLI can use it in place of a device.
+
+            with DaemonClient('/tmp/urcontrol.sock') as client:
+                client.SetParameterByName('mixer', 'InputMix1Volume', 103, 0)
+                for event in client.events():
+                    print(event.channel, event.param, event.value)
+    '''
+
+    def __init__(self, path, timeout=None):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(path)
+        self.file = self.sock.makefile('rw', encoding='utf-8', errors='replace', newline='\n')
+
+
+    def request(self, line):
+        self.file.write(line + '\n')
+        self.file.flush()
+        response = self.file.readline()
+        if not response:
+            raise ConnectionError('Daemon closed the connection')
+        return response.rstrip('\n')
+
+
+    def execute(self, line):
+        # same contract as commands.execute, the daemon does the parsing
+        words = line.split()
+        if not words or words[0].startswith('#'):
+            return None
+        return self.request(' '.join(words))
+
+
+    def GetParameterByName(self, unit, name, input=0):
+        response = self.request(f'get {unit} {name} {input+1}')
+        if response == 'TIMEOUT':
+            return None
+        if response.startswith('ERROR'):
+            raise ValueError(response[6:])
+        return int(response)
+
+
+    def SetParameterByName(self, unit, name, value, input=0):
+        response = self.request(f'set {unit} {name} {value} {input+1}')
+        if response.startswith('ERROR'):
+            raise ValueError(response[6:])
+        return response == 'OK'
+
+
+    def ResetConfig(self, progress=None):
+        self.request('reset')
+
+
+    def Stats(self):
+        '''
+            The daemon's DeviceStats.snapshot(), None when it runs without --stats.
+        '''
+        response = self.request('stats')
+        if response.startswith('ERROR'):
+            return None
+        return json.loads(response)
+
+
+    def events(self):
+        '''
+            Turns the connection into an event stream, yields protocol.ChangeParameter.
+        '''
+        if self.request('subscribe') != 'OK':
+            raise ConnectionError('Subscription refused')
+        for line in self.file:
+            kind, channel, param, value = line.split()
+            yield protocol.ChangeParameter(int(channel) - 1, int(param), int(value))
+
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,91 @@
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+from URxxx import snapshot
+
+
+class FleetResult(namedtuple('FleetResult', 'value error elapsed')):
+    # error is the exception the call raised, elapsed is in seconds
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class Fleet():
+    '''
+        Runs the same operation on many units in parallel, one pool thread per unit.
+        Every call returns {device name: FleetResult(value, error, elapsed)}; a failing
+        unit doesn't stop the others.
+
+            fleet = Fleet({'UR44C 20': ur44c_a, 'UR44C 24': ur44c_b})
+            for name, result in fleet.set('mixer', 'InputMix1Volume', 103).items():
+                print(name, result.value, result.elapsed)
+    '''
+
+    def __init__(self, devices, max_workers=None):
+        self.devices = dict(devices)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or max(1, len(self.devices)),
+                                           thread_name_prefix='Fleet')
+
+
+    def run(self, function, *args, names=None):
+        '''
+            function(device, *args) on every device (or the ones in names).
+        '''
+        def timed(device):
+            started = time.monotonic()
+            try:
+                return FleetResult(function(device, *args), None, time.monotonic() - started)
+            except Exception as e:
+                return FleetResult(None, e, time.monotonic() - started)
+
+        names = list(self.devices) if names is None else names
+        futures = {name: self.executor.submit(timed, self.devices[name]) for name in names}
+        return {name: future.result() for name, future in futures.items()}
+
+
+    def get(self, unit, name, input=0, max_age=None):
+        return self.run(lambda device: device.GetParameterByName(unit, name, input, max_age))
+
+
+    def set(self, unit, name, value, input=0):
+        return self.run(lambda device: device.SetParameterByName(unit, name, value, input))
+
+
+    def get_parameters(self, queries, window=16, check_timeout=3):
+        return self.run(lambda device: device.GetParameters(queries, window, check_timeout))
+
+
+    def set_parameters(self, changes, window=16, check_timeout=3):
+        return self.run(lambda device: device.SetParameters(changes, window, check_timeout))
+
+
+    def snapshot(self, window=16, check_timeout=1):
+        '''
+            Full state of every unit, values are {(channel, parameter): value}.
+        '''
+        return self.run(snapshot.read_snapshot, window, check_timeout)
+
+
+    def restore(self, values, window=16, check_timeout=3):
+        '''
+            values is {device name: snapshot values}, units without an entry are left alone.
+        '''
+        names = {id(device): name for name, device in self.devices.items()}
+        return self.run(lambda device: snapshot.restore_snapshot(device, values[names[id(device)]], window, check_timeout),
+                        names=[name for name in self.devices if name in values])
+
+
+    def close(self):
+        self.executor.shutdown()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,124 @@
+import threading
+import time
+
+UP = 'up'
+DEGRADED = 'degraded'
+DOWN = 'down'
+
+
+class Heartbeat():
+    '''
+        Link health monitor. Sends a keepalive every `interval` seconds; any message from
+        the device (keepalive answer, reply, change, meters) counts as a sign of life.
+
+        up          the device was heard within degraded_after intervals
+        degraded    silent for longer, requests may be slow or lost
+        down        silent for down_after intervals, or sending failed
+
+        Going down fails every pending request at once, blocking callers and AsyncUR44C
+        awaits alike, and makes new ones fail right away (router.offline), instead of each
+        caller waiting out its timeout. With reopen set, it is called every retry_interval
+        seconds while down and must return freshly opened (midi_in, midi_out) or raise; the
+        device continues on them via Reconnect and the link is up again with the next sign
+        of life.
+
+            heartbeat = Heartbeat(ur44c, reopen=lambda: utils.find_midi_ports()[:2])
+            heartbeat.subscribe(lambda old, new: print(f'link {old} -> {new}'))
+            heartbeat.start()
+    '''
+
+    def __init__(self, device, interval=1.0, degraded_after=1.5, down_after=3, reopen=None, retry_interval=2.0):
+        self.device = device
+        self.interval = interval
+        self.degraded_after = degraded_after
+        self.down_after = down_after
+        self.reopen = reopen
+        self.retry_interval = retry_interval
+
+        self.state = UP
+        self.last_seen = time.monotonic()
+        self.reconnects = 0
+        self.subscribers = []
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+
+    def subscribe(self, callback):
+        '''
+            callback(old_state, new_state), called from the heartbeat or the MIDI thread.
+        '''
+        self.subscribers = self.subscribers + [callback]
+
+
+    def unsubscribe(self, callback):
+        self.subscribers = [subscriber for subscriber in self.subscribers if subscriber is not callback]
+
+
+    def start(self):
+        self.last_seen = time.monotonic()
+        self.device.AddListener(self._on_message)
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name='Heartbeat', daemon=True)
+        self.thread.start()
+
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.device.RemoveListener(self._on_message)
+        self.device.router.offline = False
+
+
+    def _on_message(self, message):
+        self.last_seen = time.monotonic()
+        if self.state != UP:
+            self._set_state(UP)
+
+
+    def _set_state(self, state):
+        with self.lock:
+            old = self.state
+            if old == state:
+                return
+            self.state = state
+            if state == DOWN:
+                self.device.router.offline = True
+                self.device.router.fail_all()
+            elif state == UP:
+                self.device.router.offline = False
+        for callback in self.subscribers:
+            callback(old, state)
+
+
+    def _run(self):
+        next_retry = 0
+        while not self.stop_event.wait(self.interval):
+            if self.state == DOWN and self.reopen is not None:
+                now = time.monotonic()
+                if now >= next_retry:
+                    next_retry = now + self.retry_interval
+                    self._try_reopen()
+
+            try:
+                self.device.SendKeepalive()
+            except Exception:
+                self._set_state(DOWN)
+                continue
+
+            silent = time.monotonic() - self.last_seen
+            if silent > self.down_after * self.interval:
+                self._set_state(DOWN)
+            elif silent > self.degraded_after * self.interval and self.state == UP:
+                self._set_state(DEGRADED)
+
+
+    def _try_reopen(self):
+        try:
+            midi_in, midi_out = self.reopen()
+        except Exception:
+            return
+        self.device.Reconnect(midi_in, midi_out)
+        self.reconnects += 1
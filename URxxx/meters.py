@@ -0,0 +1,149 @@
+from array import array
+import sys
+import time
+
+from URxxx import protocol
+
+# inferred, not documented: 0.1dB per step is a guess from the range of the raw values
+# (silence reads around -1270), not checked against dspMixFx. Only to_db depends on it.
+DB_SCALE = 0.1
+
+# every value is a signed 7-bit high byte h and a 7-bit low byte l, value = h*128 + l.
+# As an int16 that is low byte (h&1)<<7 | l and high byte h>>1 (sign extended), so a frame
+# decodes with bytes.translate and slicing instead of one Python step per value.
+_LOW_BIT = bytes((h & 1) << 7 for h in range(256))
+_HIGH_BYTE = bytes(((h - 128 if h > 64 else h) >> 1) & 0xFF for h in range(256))
+_LOW, _HIGH = (0, 1) if sys.byteorder == 'little' else (1, 0)
+
+
+class MeterBuffer():
+    '''
+        Ring buffer of meter frames backed by preallocated arrays.
+
+        Every frame is decoded straight from the sysex message into `current` and `peak`
+        (array('h'), `count` values per frame) and its arrival time into `timestamps`.
+        Each frame is stored twice, in slot i and i+capacity, so the last N frames are always
+        one contiguous region and readers get memoryviews of it without copying.
+
+        There is one writer (the MIDI callback thread). Readers don't lock; a view can see
+        a frame being overwritten if they keep it longer than `capacity` frames.
+    '''
+
+    def __init__(self, capacity=256, count=protocol.METER_COUNT):
+        self.capacity = capacity
+        self.count = count
+        self.current = array('h', bytes(2 * 2*capacity*count))
+        self.peak = array('h', bytes(2 * 2*capacity*count))
+        self.timestamps = array('d', bytes(8 * 2*capacity))
+        self.frames = 0
+
+        self._current_view = memoryview(self.current)
+        self._peak_view = memoryview(self.peak)
+        self._timestamps_view = memoryview(self.timestamps)
+        self._current_bytes = self._current_view.cast('B')
+        self._peak_bytes = self._peak_view.cast('B')
+
+
+    def push(self, message, timestamp=None):
+        '''
+            Decode the meter sysex message (F0 43 10 3E 14 02 03 ...) into the next slot.
+        '''
+        if timestamp is None:
+            timestamp = time.monotonic()
+        count = self.count
+        size = 2*count
+        slot = self.frames % self.capacity
+        first = slot * size
+        second = (slot + self.capacity) * size
+
+        data = bytes(message[7:7 + 4*count])
+        # current values are at offset 0 of every 4 bytes, peaks at offset 2
+        for offset, view in ((0, self._current_bytes), (2, self._peak_bytes)):
+            high = data[offset::4]
+            low = int.from_bytes(high.translate(_LOW_BIT), 'big') | int.from_bytes(data[offset+1::4], 'big')
+            view[first+_LOW:first+size:2] = low.to_bytes(count, 'big')
+            view[first+_HIGH:first+size:2] = high.translate(_HIGH_BYTE)
+            view[second:second+size] = view[first:first+size]
+
+        self.timestamps[slot] = timestamp
+        self.timestamps[slot + self.capacity] = timestamp
+        self.frames += 1
+
+
+    def _window(self, n):
+        # the newest frame is in slot (frames-1) % capacity and its copy one capacity later
+        n = min(n, self.frames, self.capacity)
+        end = (self.frames - 1) % self.capacity + self.capacity + 1
+        return end - n, end
+
+
+    def latest(self):
+        '''
+            (current, peak, timestamp) of the newest frame, current/peak are memoryviews.
+            None if no frame has arrived yet.
+        '''
+        if not self.frames:
+            return None
+        start, end = self._window(1)
+        count = self.count
+        return (self._current_view[start*count:end*count],
+                self._peak_view[start*count:end*count],
+                self.timestamps[start])
+
+
+    def last(self, n):
+        '''
+            (current, peak, timestamps) of the last n frames, oldest first, as memoryviews.
+            current/peak are flat with `count` values per frame.
+        '''
+        start, end = self._window(n)
+        count = self.count
+        return (self._current_view[start*count:end*count],
+                self._peak_view[start*count:end*count],
+                self._timestamps_view[start:end])
+
+
+    def column(self, meter, n, peak=False):
+        '''
+            Values of one meter over the last n frames as a strided memoryview.
+        '''
+        start, end = self._window(n)
+        view = self._peak_view if peak else self._current_view
+        return view[start*self.count + meter:end*self.count:self.count]
+
+
+    def peak_hold(self, n, out=None):
+        '''
+            Highest peak of every meter over the last n frames.
+        '''
+        if out is None:
+            out = array('h', bytes(2*self.count))
+        start, end = self._window(n)
+        if start == end:
+            return out
+        view = self._peak_view
+        count = self.count
+        # one max() per meter over its strided column, the frames are walked in C
+        for i in range(count):
+            out[i] = max(view[start*count + i:end*count:count])
+        return out
+
+
+    def as_numpy(self):
+        '''
+            (current, peak) as zero-copy numpy arrays of shape (2*capacity, count).
+            Rows [frames%capacity, frames%capacity + capacity) hold the ring oldest first.
+            numpy is optional (pip install urcontrol[numpy]), only this method needs it.
+        '''
+        import numpy
+        shape = (2*self.capacity, self.count)
+        return (numpy.frombuffer(self.current, dtype=numpy.int16).reshape(shape),
+                numpy.frombuffer(self.peak, dtype=numpy.int16).reshape(shape))
+
+
+def to_db(values):
+    '''
+        Convert raw meter values (any iterable of ints, e.g. a view from MeterBuffer) to dB.
+        Uses the inferred DB_SCALE.
+    '''
+    return array('f', map(DB_SCALE.__mul__, values))
@@ -0,0 +1,462 @@
+'''
+    OSC over UDP bridge for control surfaces and show control.
+
+    Addresses (INPUT is 1-based, like the CLI):
+
+        /ur/UNIT/NAME/INPUT VALUE       set a parameter (int or float, floats are rounded)
+        /ur/UNIT/NAME/INPUT             get, answered with /ur/UNIT/NAME/INPUT VALUE
+        /ur/subscribe [RATE]            push device side changes, at most RATE packets/s
+        /ur/meters/subscribe [RATE]     push meter frames, at most RATE frames/s
+        /ur/unsubscribe                 drop both subscriptions
+
+    A get is answered from the parameter cache when it holds the value, otherwise the query
+    goes on the wire and the reply is sent from the MIDI thread when it arrives, so a slow
+    or silent device never holds up the receive thread and the other clients.
+
+    Subscriptions are leases: they expire after `lease` seconds unless the client sends
+    the subscribe message again. Changes are coalesced per address between two packets of a
+    client and sent as bundles. Meter frames go out as /ur/meters (current values) and
+    /ur/meters/peak, METER_COUNT ints each. Problems are reported as /ur/error MESSAGE.
+'''
+
+import math
+import socket
+import struct
+import threading
+import time
+
+from URxxx.scheduler import WriteScheduler
+
+MAX_PACKET = 1400
+BUNDLE_TAG = b'#bundle\0'
+IMMEDIATELY = b'\0\0\0\0\0\0\0\1'
+
+
+def _pad(data):
+    return data + b'\0' * (4 - len(data) % 4)
+
+
+def _read_string(data, offset):
+    end = data.index(b'\0', offset)
+    return data[offset:end].decode('utf-8'), (end + 4) & ~3
+
+
+def encode_message(address, *args):
+    tags = ','
+    payload = []
+    for arg in args:
+        if isinstance(arg, bool):
+            tags += 'T' if arg else 'F'
+        elif isinstance(arg, int):
+            tags += 'i'
+            payload.append(struct.pack('>i', arg))
+        elif isinstance(arg, float):
+            tags += 'f'
+            payload.append(struct.pack('>f', arg))
+        elif isinstance(arg, str):
+            tags += 's'
+            payload.append(_pad(arg.encode('utf-8')))
+        elif isinstance(arg, (bytes, bytearray)):
+            tags += 'b'
+            payload.append(struct.pack('>i', len(arg)) + bytes(arg) + b'\0' * (-len(arg) % 4))
+        else:
+            raise TypeError(f'Unsupported OSC argument {arg!r}')
+    return _pad(address.encode('utf-8')) + _pad(tags.encode('ascii')) + b''.join(payload)
+
+
+def encode_bundle(messages):
+    '''
+        Bundle of already encoded messages, to be handled immediately.
+    '''
+    return BUNDLE_TAG + IMMEDIATELY + b''.join(struct.pack('>i', len(m)) + m for m in messages)
+
+
+def decode_message(data):
+    '''
+        Returns (address, [args]). Raises ValueError for malformed messages.
+    '''
+    try:
+        address, offset = _read_string(data, 0)
+        if offset >= len(data):
+            # type tags are optional in OSC 1.0
+            return address, []
+        tags, offset = _read_string(data, offset)
+        if not tags.startswith(','):
+            raise ValueError('Missing type tags')
+        args = []
+        for tag in tags[1:]:
+            if tag == 'i':
+                args.append(struct.unpack_from('>i', data, offset)[0])
+                offset += 4
+            elif tag == 'f':
+                args.append(struct.unpack_from('>f', data, offset)[0])
+                offset += 4
+            elif tag == 'd':
+                args.append(struct.unpack_from('>d', data, offset)[0])
+                offset += 8
+            elif tag == 'h':
+                args.append(struct.unpack_from('>q', data, offset)[0])
+                offset += 8
+            elif tag == 's':
+                arg, offset = _read_string(data, offset)
+                args.append(arg)
+            elif tag == 'b':
+                size = struct.unpack_from('>i', data, offset)[0]
+                args.append(bytes(data[offset+4:offset+4+size]))
+                offset += 4 + ((size + 3) & ~3)
+            elif tag in 'TF':
+                args.append(tag == 'T')
+            elif tag == 'N':
+                args.append(None)
+            else:
+                raise ValueError(f'Unsupported OSC type tag {tag}')
+        return address, args
+    except (struct.error, UnicodeDecodeError) as e:
+        raise ValueError(f'Malformed OSC message: {e}') from None
+
+
+def decode_packet(data):
+    '''
+        Messages of a packet, bundles (also nested ones) are flattened.
+        Raises ValueError for malformed packets.
+    '''
+    if not data.startswith(BUNDLE_TAG):
+        return [decode_message(data)]
+    messages = []
+    offset = 16
+    while offset < len(data):
+        try:
+            size = struct.unpack_from('>i', data, offset)[0]
+        except struct.error as e:
+            raise ValueError(f'Malformed OSC bundle: {e}') from None
+        if size < 0 or offset + 4 + size > len(data):
+            raise ValueError(f'Malformed OSC bundle: element of {size} bytes at {offset}')
+        messages.extend(decode_packet(data[offset+4:offset+4+size]))
+        offset += 4 + size
+    return messages
+
+
+def pack_bundles(messages, max_size=MAX_PACKET):
+    '''
+        Encoded messages grouped into as few bundles as fit in max_size bytes each.
+    '''
+    packets = []
+    current = []
+    size = 16
+    for message in messages:
+        if current and size + 4 + len(message) > max_size:
+            packets.append(encode_bundle(current))
+            current = []
+            size = 16
+        current.append(message)
+        size += 4 + len(message)
+    if current:
+        packets.append(encode_bundle(current))
+    return packets
+
+
+class _Client():
+    def __init__(self, address):
+        self.address = address
+        self.changes_until = 0
+        self.change_interval = 0
+        self.next_changes = 0
+        self.pending = {}
+        self.meters_until = 0
+        self.meter_interval = 0
+        self.next_meters = 0
+        self.last_frame = 0
+
+
+class OSCBridge():
+    '''
+        Maps OSC messages onto a device. Runs a receive thread and a push thread.
+
+            bridge = OSCBridge(ur44c, ('127.0.0.1', 9000))
+            bridge.start()
+            ...
+            bridge.close()
+    '''
+
+    def __init__(self, device, address=('127.0.0.1', 9000), rate=30, meter_rate=15, lease=10, write_rate=50, query_timeout=3):
+        self.device = device
+        self.registry = device.registry
+        self.rate = rate
+        self.meter_rate = meter_rate
+        self.lease = lease
+        self.query_timeout = query_timeout
+        self.scheduler = WriteScheduler(device, write_rate, on_failure=self._write_failed)
+
+        self.clients = {}
+        # (client address, OSC address, router request) -> deadline of gets on the wire
+        self.queries = {}
+        self.lock = threading.Lock()
+        self.running = False
+        self.metering = False
+        self.threads = []
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(address)
+        self.sock.settimeout(0.2)
+        self.address = self.sock.getsockname()
+
+        device.EnableCache()
+        device.AddListener(self._on_message)
+
+
+    def start(self):
+        self.running = True
+        for target, name in ((self._receive, 'OSCReceive'), (self._push, 'OSCPush')):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+
+    def close(self):
+        self.running = False
+        for thread in self.threads:
+            thread.join()
+        self.scheduler.stop()
+        self.device.RemoveListener(self._on_message)
+        if self.metering:
+            self.device.UnsubscribeMeters()
+            self.metering = False
+        self.sock.close()
+
+
+    def _send(self, client_address, packet):
+        try:
+            self.sock.sendto(packet, client_address)
+        except OSError:
+            # the client went away, its lease will expire
+            pass
+
+
+    def _error(self, client_address, text):
+        self._send(client_address, encode_message('/ur/error', text))
+
+
+    def _receive(self):
+        while self.running:
+            try:
+                data, client_address = self.sock.recvfrom(65536)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            # whatever a datagram contains, it must not end the receive thread
+            try:
+                messages = decode_packet(data)
+            except ValueError as e:
+                self._error(client_address, str(e))
+                continue
+            except Exception as e:
+                self._error(client_address, f'Malformed OSC packet: {e!r}')
+                continue
+            for address, args in messages:
+                try:
+                    self.handle(client_address, address, args)
+                except ValueError as e:
+                    self._error(client_address, f'{address}: {e}')
+                except Exception as e:
+                    self._error(client_address, f'{address}: internal error {e!r}')
+
+
+    def handle(self, client_address, address, args):
+        parts = address.strip('/').split('/')
+        if parts[0] != 'ur':
+            raise ValueError('unknown address')
+
+        if parts[1:] == ['subscribe']:
+            self._subscribe(client_address, changes=self._rate_arg(args, self.rate))
+        elif parts[1:] == ['meters', 'subscribe']:
+            self._subscribe(client_address, meters=self._rate_arg(args, self.meter_rate))
+        elif parts[1:] == ['unsubscribe']:
+            with self.lock:
+                self.clients.pop(client_address, None)
+        elif len(parts) == 4:
+            unit, name, input = self._target(parts[1:])
+            if args:
+                self._set(unit, name, input, args[0])
+            else:
+                self._get(client_address, address, unit, name, input)
+        else:
+            raise ValueError('unknown address')
+
+
+    def _rate_arg(self, args, default):
+        if not args:
+            return default
+        if not isinstance(args[0], (int, float)) or not 0 < args[0] < math.inf:
+            raise ValueError('rate must be a positive number')
+        return args[0]
+
+
+    def _target(self, parts):
+        unit, name, input = parts
+        if unit not in self.registry.units:
+            raise ValueError(f'unknown unit {unit}')
+        try:
+            self.registry.index(unit, name)
+        except AttributeError:
+            raise ValueError(f'unknown parameter {name}') from None
+        try:
+            input = int(input) - 1
+        except ValueError:
+            raise ValueError(f'bad input {input}') from None
+        if not 0 <= input < self.device.num_inputs:
+            raise ValueError(f'input out of range 1-{self.device.num_inputs}')
+        return unit, name, input
+
+
+    def _set(self, unit, name, input, value):
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            raise ValueError('value must be a number')
+        if not math.isfinite(value):
+            raise ValueError('value must be finite')
+        value = int(round(value))
+        param_num, min_val, max_val, def_val = self.registry.lookup(unit, name)
+        if not min_val <= value <= max_val:
+            raise ValueError(f'value out of range {min_val}..{max_val}')
+        self.scheduler.set(unit, name, value, input)
+
+
+    def _get(self, client_address, address, unit, name, input):
+        param = self.registry.lookup(unit, name)[0]
+        cache = self.device.cache
+        value = cache.get(input, param) if cache is not None else None
+        if value is not None:
+            self._send(client_address, encode_message(address, value))
+            return
+
+        router = self.device.router
+        query = (client_address, address, router.request(input, param))
+        with self.lock:
+            self.queries[query] = time.monotonic() + self.query_timeout
+        router.add_callback(query[2], lambda request: self._answer(query))
+
+
+    def _answer(self, query, expired=False):
+        # MIDI thread when the reply arrives, push thread when it is overdue
+        with self.lock:
+            if self.queries.pop(query, None) is None:
+                return
+        client_address, address, request = query
+        self.device.router.release(request)
+        if expired or request.failed:
+            self._error(client_address, f'{address}: device did not answer')
+        else:
+            self._send(client_address, encode_message(address, request.value))
+
+
+    def _write_failed(self, unit, name, value, input):
+        # scheduler thread, tell every change subscriber
+        message = encode_message('/ur/error', f'/ur/{unit}/{name}/{input+1}: write of {value} not confirmed')
+        now = time.monotonic()
+        with self.lock:
+            addresses = [c.address for c in self.clients.values() if c.changes_until > now]
+        for client_address in addresses:
+            self._send(client_address, message)
+
+
+    def _subscribe(self, client_address, changes=None, meters=None):
+        now = time.monotonic()
+        with self.lock:
+            client = self.clients.get(client_address)
+            if client is None:
+                client = self.clients[client_address] = _Client(client_address)
+            if changes:
+                client.changes_until = now + self.lease
+                client.change_interval = 1.0 / changes
+            if meters:
+                client.meters_until = now + self.lease
+                client.meter_interval = 1.0 / meters
+        if meters and not self.metering:
+            self.metering = True
+            self.device.SubscribeMeters()
+
+
+    def _on_message(self, message):
+        # MIDI thread, only queue the change, the push thread sends it
+        if message.type not in ('change-parameter', 'reply-parameter'):
+            return
+        names = self.registry.names(message.param)
+        if not names:
+            return
+        now = time.monotonic()
+        with self.lock:
+            for client in self.clients.values():
+                if client.changes_until > now:
+                    for unit, name in names:
+                        client.pending[f'/ur/{unit}/{name}/{message.channel+1}'] = message.value
+
+
+    def _push(self, tick=0.005):
+        while self.running:
+            time.sleep(tick)
+            now = time.monotonic()
+            packets = []
+            with self.lock:
+                expired = [query for query, deadline in self.queries.items() if deadline <= now]
+                for client_address, client in list(self.clients.items()):
+                    if client.changes_until <= now and client.meters_until <= now:
+                        del self.clients[client_address]
+                        continue
+                    if client.pending and now >= client.next_changes:
+                        messages = [encode_message(address, value) for address, value in client.pending.items()]
+                        client.pending.clear()
+                        client.next_changes = now + client.change_interval
+                        packets.extend((client_address, packet) for packet in pack_bundles(messages))
+                    if client.meters_until > now and now >= client.next_meters and client.last_frame != self.device.meters.frames:
+                        client.last_frame = self.device.meters.frames
+                        client.next_meters = now + client.meter_interval
+                        packets.append((client_address, self._meter_packet()))
+                metering = any(client.meters_until > now for client in self.clients.values())
+
+            for query in expired:
+                self._answer(query, expired=True)
+            if self.metering and not metering:
+                self.metering = False
+                self.device.UnsubscribeMeters()
+            for client_address, packet in packets:
+                self._send(client_address, packet)
+
+
+    def _meter_packet(self):
+        current, peak, timestamp = self.device.meters.latest()
+        return encode_bundle([encode_message('/ur/meters', *current), encode_message('/ur/meters/peak', *peak)])
+
+
+class OSCClient():
+    '''
+        Minimal OSC peer, for scripts and loopback tests.
+
+            client = OSCClient(bridge.address)
+            client.send('/ur/mixer/InputMix1Volume/1')
+            address, args = client.receive()
+    '''
+
+    def __init__(self, server_address, timeout=1.0):
+        self.server_address = server_address
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(('127.0.0.1' if server_address[0] in ('127.0.0.1', 'localhost') else '', 0))
+        self.sock.settimeout(timeout)
+
+
+    def send(self, address, *args):
+        self.sock.sendto(encode_message(address, *args), self.server_address)
+
+
+    def receive(self):
+        '''
+            Messages of the next packet, [] on timeout.
+        '''
+        try:
+            data, _ = self.sock.recvfrom(65536)
+        except socket.timeout:
+            return []
+        return decode_packet(data)
+
+
+    def close(self):
+        self.sock.close()
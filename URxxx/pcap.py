@@ -0,0 +1,393 @@
+'''
+    Streaming decoder for usbmon captures (pcap or pcapng, as saved by Wireshark or
+    tcpdump -i usbmonN) of the mixer control traffic.
+
+    USB-MIDI carries MIDI in 4 byte event packets: a header byte (cable << 4 | CIN) and 3
+    MIDI bytes. A sysex arrives as CIN 4 packets (start/continue, 3 bytes) ended by CIN 5,
+    6 or 7 (1, 2 or 3 bytes) - the mapping offset() in mixer-control-protocol.lua does by
+    index. Unlike the dissector, which looks at one transfer at a time, the reassembly here
+    continues across transfers, so meter frames longer than a USB packet come out whole.
+    Messages are decoded with protocol.parse.
+
+    Everything is a generator over the file, memory use doesn't depend on its size.
+
+        for message in read_messages('capture.pcapng'):
+            print(message.time, message.parsed)
+
+        stats = ParameterStats()
+        stats.update(read_messages('capture.pcapng'))
+'''
+
+from array import array
+from collections import namedtuple
+import struct
+
+from URxxx import protocol
+from URxxx.recorder import INCOMING, OUTGOING
+
+LINKTYPE_USB_LINUX = 189
+LINKTYPE_USB_LINUX_MMAPPED = 220
+
+# a lost end of sysex mustn't grow the reassembly buffer forever; the largest known
+# message is the 5880 byte bulk dump
+MAX_SYSEX = 65536
+
+_PCAP_HEADER = struct.Struct('IHHiIII')
+_PCAP_RECORD = struct.Struct('IIII')
+_PCAPNG_MAGIC = 0x0A0D0D0A
+_PCAPNG_BYTE_ORDER = 0x1A2B3C4D
+
+# usbmon packet header, in the byte order of the capturing host (little endian in practice):
+# id, type, xfer_type, epnum, devnum, busnum, flag_setup, flag_data, ts_sec, ts_usec,
+# status, length, len_cap, setup; the mmapped variant adds 16 bytes
+_USBMON = struct.Struct('<QBBBBHbbqiiII8s')
+_USBMON_SIZES = {LINKTYPE_USB_LINUX: 48, LINKTYPE_USB_LINUX_MMAPPED: 64}
+
+_SUBMIT = ord('S')
+_COMPLETE = ord('C')
+_INTERRUPT = 1
+_BULK = 3
+
+# USB-MIDI code index numbers of the sysex packets -> MIDI bytes in the packet
+_SYSEX_START = 0x4
+_SYSEX_END = {0x5: 1, 0x6: 2, 0x7: 3}
+
+
+class Packet(namedtuple('Packet', 'time linktype data')):
+    # time in seconds since the epoch
+    __slots__ = ()
+
+
+class Transfer(namedtuple('Transfer', 'time direction bus device endpoint data')):
+    # endpoint without the direction bit, direction is INCOMING (device to host) or OUTGOING
+    __slots__ = ()
+
+
+class Message(namedtuple('Message', 'time direction bus device endpoint cable data parsed')):
+    # data is the sysex (bytes), parsed what protocol.parse made of it
+    __slots__ = ()
+
+
+def read_packets(file):
+    '''
+        Packets of a pcap or pcapng file (path or binary file object), in file order.
+        A capture cut off in the middle of a packet ends with the last whole one; malformed
+        files raise ValueError.
+    '''
+    if isinstance(file, (str, bytes)) or hasattr(file, '__fspath__'):
+        with open(file, 'rb') as f:
+            yield from read_packets(f)
+        return
+
+    head = file.read(4)
+    if len(head) < 4:
+        return
+    if struct.unpack('<I', head)[0] == _PCAPNG_MAGIC:
+        yield from _read_pcapng(file, head)
+    else:
+        yield from _read_pcap(file, head)
+
+
+def _read(file, size):
+    data = file.read(size)
+    if len(data) < size:
+        # capture cut off in the middle of a packet
+        raise EOFError
+    return data
+
+
+def _read_pcap(file, head):
+    magic = struct.unpack('<I', head)[0]
+    if magic in (0xA1B2C3D4, 0xA1B23C4D):
+        order = '<'
+    elif magic in (0xD4C3B2A1, 0x4D3CB2A1):
+        order = '>'
+        magic = struct.unpack('>I', head)[0]
+    else:
+        raise ValueError('Not a pcap or pcapng file')
+    # nanosecond timestamps with the modified magic
+    units = 1000000000 if magic == 0xA1B23C4D else 1000000
+    header = struct.Struct(order + _PCAP_HEADER.format)
+    record = struct.Struct(order + _PCAP_RECORD.format)
+
+    try:
+        linktype = header.unpack(head + _read(file, header.size - 4))[6] & 0xFFFF
+        while True:
+            data = file.read(record.size)
+            if len(data) < record.size:
+                return
+            sec, frac, captured, original = record.unpack(data)
+            yield Packet(sec + frac / units, linktype, _read(file, captured))
+    except EOFError:
+        return
+
+
+def _tsresol(options, order):
+    # if_tsresol option of an interface description block -> timestamp units per second,
+    # divided by rather than multiplied with its inverse so 10**-n steps stay exact
+    offset = 0
+    while offset + 4 <= len(options):
+        code, length = struct.unpack_from(order + 'HH', options, offset)
+        if code == 0:
+            break
+        if code == 9 and length >= 1:
+            resolution = options[offset + 4]
+            return 2 ** (resolution & 0x7F) if resolution & 0x80 else 10 ** resolution
+        offset += 4 + (length + 3) // 4 * 4
+    return 1000000
+
+
+def _read_pcapng(file, head):
+    order = '<'
+    # (linktype, timestamp units per second) of every interface in the current section
+    interfaces = []
+    try:
+        while True:
+            if head is None:
+                head = file.read(4)
+                if len(head) < 4:
+                    return
+            rest = _read(file, 4)
+            block_type = struct.unpack(order + 'I', head)[0]
+            if block_type == _PCAPNG_MAGIC:
+                # section header, the byte order magic decides how to read the rest
+                bom = _read(file, 4)
+                order = '<' if struct.unpack('<I', bom)[0] == _PCAPNG_BYTE_ORDER else '>'
+                length = struct.unpack(order + 'I', rest)[0]
+                if length < 28:
+                    raise ValueError(f'Malformed pcapng section header of {length} bytes')
+                file.read(length - 12)
+                interfaces = []
+                head = None
+                continue
+
+            length = struct.unpack(order + 'I', rest)[0]
+            if length < 12:
+                raise ValueError(f'Malformed pcapng block of {length} bytes')
+            body = _read(file, length - 12)
+            _read(file, 4)
+            head = None
+
+            if block_type == 1:
+                # interface description
+                linktype = struct.unpack_from(order + 'H', body, 0)[0]
+                interfaces.append((linktype, _tsresol(body[8:], order)))
+            elif block_type in (6, 2):
+                # enhanced packet / obsolete packet block
+                if block_type == 6:
+                    interface, high, low, captured, original = struct.unpack_from(order + 'IIIII', body, 0)
+                else:
+                    interface, drops, high, low, captured, original = struct.unpack_from(order + 'HHIIII', body, 0)
+                if interface >= len(interfaces):
+                    raise ValueError(f'Packet of undescribed interface {interface}')
+                linktype, units = interfaces[interface]
+                yield Packet((high << 32 | low) / units, linktype, body[20:20+captured])
+            elif block_type == 3:
+                # simple packet block, no timestamp and always the first interface
+                original = struct.unpack_from(order + 'I', body, 0)[0]
+                if not interfaces:
+                    raise ValueError('Packet of undescribed interface 0')
+                linktype, units = interfaces[0]
+                yield Packet(None, linktype, body[4:4+min(original, len(body)-4)])
+    except EOFError:
+        return
+    except struct.error as e:
+        # a block too short for its fixed fields
+        raise ValueError(f'Malformed pcapng block: {e}') from None
+
+
+def read_transfers(packets):
+    '''
+        Bulk and interrupt transfers with data from usbmon packets: what the host sent (in the
+        submission) and what the device answered (in the completion). Packets of other link
+        types are skipped.
+    '''
+    for packet in packets:
+        size = _USBMON_SIZES.get(packet.linktype)
+        if size is None or len(packet.data) < size:
+            continue
+        (urb_id, event, xfer_type, epnum, devnum, busnum, flag_setup, flag_data,
+         sec, usec, status, length, captured, setup) = _USBMON.unpack_from(packet.data, 0)
+        if xfer_type not in (_BULK, _INTERRUPT) or not captured:
+            continue
+        if epnum & 0x80:
+            if event != _COMPLETE or status != 0:
+                continue
+            direction = INCOMING
+        else:
+            if event != _SUBMIT:
+                continue
+            direction = OUTGOING
+        time = packet.time if packet.time is not None else sec + usec * 1e-6
+        yield Transfer(time, direction, busnum, devnum, epnum & 0x7F, packet.data[size:size+captured])
+
+
+class SysexAssembler():
+    '''
+        Collects the sysex messages out of the USB-MIDI packets of one stream (a direction of
+        one endpoint of one device), per cable. Other MIDI messages are ignored.
+    '''
+
+    def __init__(self):
+        self.buffers = {}
+
+
+    def feed(self, data):
+        '''
+            Yields (cable, sysex bytes) for every message completed by data.
+        '''
+        buffers = self.buffers
+        for offset in range(0, len(data) - 3, 4):
+            header = data[offset]
+            cin = header & 0x0F
+            if header == 0:
+                # padding, nothing follows in this transfer
+                break
+            cable = header >> 4
+            if cin == _SYSEX_START:
+                if data[offset+1] == 0xF0:
+                    # a new message, whatever was left over lost its end
+                    buffers[cable] = bytearray(data[offset+1:offset+4])
+                    continue
+                buffer = buffers.get(cable)
+                if buffer is not None:
+                    buffer += data[offset+1:offset+4]
+                    if len(buffer) > MAX_SYSEX:
+                        del buffers[cable]
+            elif cin in _SYSEX_END:
+                end = offset + 1 + _SYSEX_END[cin]
+                buffer = buffers.pop(cable, None)
+                if buffer is not None:
+                    buffer += data[offset+1:end]
+                    yield cable, bytes(buffer)
+                elif data[offset+1] == 0xF0:
+                    # short sysex that fits in a single packet
+                    yield cable, bytes(data[offset+1:end])
+
+
+def read_messages(capture, device=None, cables=None):
+    '''
+        Decoded sysex messages of a capture (file name, file object or read_packets()
+        result). device=(bus, device number) and cables limit it to one unit / some USB-MIDI
+        cables.
+    '''
+    if hasattr(capture, 'read') or isinstance(capture, (str, bytes)) or hasattr(capture, '__fspath__'):
+        capture = read_packets(capture)
+    streams = {}
+    for transfer in read_transfers(capture):
+        if device is not None and (transfer.bus, transfer.device) != tuple(device):
+            continue
+        key = (transfer.bus, transfer.device, transfer.endpoint, transfer.direction)
+        assembler = streams.get(key)
+        if assembler is None:
+            assembler = streams[key] = SysexAssembler()
+        for cable, data in assembler.feed(transfer.data):
+            if cables is not None and cable not in cables:
+                continue
+            yield Message(transfer.time, transfer.direction, transfer.bus, transfer.device,
+                          transfer.endpoint, cable, data, protocol.parse(data))
+
+
+def to_columns(messages):
+    '''
+        Columnar table of messages: {column: array} with one entry per message. channel and
+        param are -1 and value 0 for messages without them; type is a list of protocol type
+        names. Roughly 40 bytes per message.
+    '''
+    columns = {
+        'time': array('d'),
+        'direction': array('b'),
+        'bus': array('H'),
+        'device': array('B'),
+        'cable': array('B'),
+        'type': [],
+        'channel': array('h'),
+        'param': array('i'),
+        'value': array('q'),
+    }
+    time, direction, bus, device, cable, type, channel, param, value = columns.values()
+    for message in messages:
+        parsed = message.parsed
+        time.append(message.time or 0.0)
+        direction.append(message.direction)
+        bus.append(message.bus)
+        device.append(message.device)
+        cable.append(message.cable)
+        type.append(parsed.type)
+        channel.append(getattr(parsed, 'channel', -1))
+        param.append(getattr(parsed, 'param', -1))
+        value.append(getattr(parsed, 'value', 0))
+    return columns
+
+
+class ParameterCount():
+    '''
+        What a capture shows about one parameter id.
+    '''
+    __slots__ = ('param', 'changes', 'queries', 'replies', 'channels', 'min', 'max', 'first', 'last')
+
+    def __init__(self, param):
+        self.param = param
+        self.changes = 0
+        self.queries = 0
+        self.replies = 0
+        self.channels = set()
+        self.min = None
+        self.max = None
+        self.first = None
+        self.last = None
+
+
+    @property
+    def count(self):
+        return self.changes + self.queries + self.replies
+
+
+class ParameterStats():
+    '''
+        Which parameter ids appear in a capture, how often and with which values. Memory
+        grows with the number of distinct parameters only.
+
+            stats = ParameterStats()
+            stats.update(read_messages('capture.pcapng'))
+            for entry in stats.most_common(10):
+                print(entry.param, entry.count, entry.min, entry.max)
+    '''
+
+    _COUNTERS = {'change-parameter': 'changes', 'query-parameter': 'queries', 'reply-parameter': 'replies'}
+
+    def __init__(self):
+        self.params = {}
+        # messages by protocol type, also the ones without a parameter
+        self.types = {}
+
+
+    def add(self, message):
+        parsed = message.parsed
+        self.types[parsed.type] = self.types.get(parsed.type, 0) + 1
+        counter = self._COUNTERS.get(parsed.type)
+        if counter is None:
+            return
+        entry = self.params.get(parsed.param)
+        if entry is None:
+            entry = self.params[parsed.param] = ParameterCount(parsed.param)
+        setattr(entry, counter, getattr(entry, counter) + 1)
+        entry.channels.add(parsed.channel)
+        if entry.first is None:
+            entry.first = message.time
+        entry.last = message.time
+        value = getattr(parsed, 'value', None)
+        if value is not None:
+            entry.min = value if entry.min is None else min(entry.min, value)
+            entry.max = value if entry.max is None else max(entry.max, value)
+
+
+    def update(self, messages):
+        for message in messages:
+            self.add(message)
+        return self
+
+
+    def most_common(self, n=None):
+        entries = sorted(self.params.values(), key=lambda entry: entry.count, reverse=True)
+        return entries if n is None else entries[:n]
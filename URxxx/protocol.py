@@ -0,0 +1,141 @@
+'''
+    Decoder for the mixer sysex messages into typed, immutable message objects.
+
+    The length picks the only message kind it can be, one compare against that kind's fixed
+    header (everything in front of the data) confirms it; anything else is Unknown. The
+    fields are then read by indexing, with shifts for the 7-bit groups.
+'''
+
+from collections import namedtuple
+
+METER_COUNT = 47
+METER_DATA_END = 7 + 4*METER_COUNT
+CHANGE_SIZE = 19
+
+
+class ChangeParameter(namedtuple('ChangeParameter', 'channel param value')):
+    __slots__ = ()
+    type = 'change-parameter'
+
+
+class QueryParameter(namedtuple('QueryParameter', 'channel param')):
+    __slots__ = ()
+    type = 'query-parameter'
+
+
+class ReplyParameter(namedtuple('ReplyParameter', 'channel param value')):
+    __slots__ = ()
+    type = 'reply-parameter'
+
+
+class Keepalive(namedtuple('Keepalive', '')):
+    __slots__ = ()
+    type = 'keepalive'
+
+
+class Meters(namedtuple('Meters', 'data')):
+    # data is the original message, MeterBuffer.push decodes it
+    __slots__ = ()
+    type = 'meters'
+
+
+class Unknown(namedtuple('Unknown', 'data')):
+    __slots__ = ()
+    type = 'unknown'
+
+
+KEEPALIVE = Keepalive()
+
+
+_new = tuple.__new__
+
+# fixed bytes in front of the data
+_CHANGE_HEADER = [0xF0, 0x43, 0x10, 0x3E, 0x14, 0x01, 0x01, 0x00]
+_QUERY_HEADER = [0xF0, 0x43, 0x30, 0x3E, 0x14, 0x01, 0x04, 0x02, 0x00]
+_REPLY_HEADER = [0xF0, 0x43, 0x10, 0x3E, 0x14, 0x01, 0x04, 0x02, 0x00]
+_KEEPALIVE = [0xF0, 0x43, 0x10, 0x3E, 0x14, 0x00, 0x04, 0x02, 0xF7]
+_METERS_HEADER = [0xF0, 0x43, 0x10, 0x3E, 0x14, 0x02, 0x03]
+
+
+def parse(message):
+    # rtmidi hands over lists, recordings and captures bytes; decoded from a list either way,
+    # data keeps the original message
+    m = message if message.__class__ is list else list(message)
+    size = len(m)
+    # F0 43 10 3E 14 01 04 02 00 pp pp 00 00 cc vv vv vv vv vv F7
+    if size == 20:
+        if m[:9] == _REPLY_HEADER:
+            v32 = m[14] << 28 | m[15] << 21 | m[16] << 14 | m[17] << 7 | m[18]
+            return _new(ReplyParameter, (m[13], m[9] << 7 | m[10], (v32 & 0x7FFFFFFF) - (v32 & 0x80000000)))
+    # F0 43 10 3E 14 01 01 00 pp pp 00 00 cc vv vv vv vv vv F7
+    elif size == 19:
+        if m[:8] == _CHANGE_HEADER:
+            v32 = m[13] << 28 | m[14] << 21 | m[15] << 14 | m[16] << 7 | m[17]
+            return _new(ChangeParameter, (m[12], m[8] << 7 | m[9], (v32 & 0x7FFFFFFF) - (v32 & 0x80000000)))
+    # F0 43 30 3E 14 01 04 02 00 pp pp 00 00 cc F7
+    elif size == 15:
+        if m[:9] == _QUERY_HEADER:
+            return _new(QueryParameter, (m[13], m[9] << 7 | m[10]))
+    # F0 43 10 3E 14 00 04 02 F7
+    elif size == 9:
+        if m == _KEEPALIVE:
+            return KEEPALIVE
+    # F0 43 10 3E 14 02 03 ........
+    elif size >= METER_DATA_END and m[:7] == _METERS_HEADER:
+        return _new(Meters, (message,))
+    return _new(Unknown, (message,))
+
+
+def _value_suffix(value):
+    v32 = value & 0xFFFFFFFF
+    return bytes(((v32 >> 28) & 0x7F, (v32 >> 21) & 0x7F, (v32 >> 14) & 0x7F, (v32 >> 7) & 0x7F, v32 & 0x7F, 0xF7))
+
+
+class Encoder():
+    '''
+        Template based encoder for outgoing parameter messages.
+
+        The fixed part of a change message (everything up to the value) and the whole query
+        message are built once per (channel, param), the value bytes (+ F7) once per value;
+        encoding is then two dict lookups and one bytes concatenation. Messages are bytes,
+        rtmidi accepts any sequence of ints.
+    '''
+
+    def __init__(self):
+        self.change_templates = {}
+        self.query_templates = {}
+        self.values = {}
+
+
+    def change(self, channel, param, value):
+        prefix = self.change_templates.get((channel, param))
+        if prefix is None:
+            prefix = self.change_templates[(channel, param)] = bytes(
+                (0xF0, 0x43, 0x10, 0x3E, 0x14, 0x01, 0x01, 0x00, (param >> 7) & 0x7F, param & 0x7F, 0x00, 0x00, channel))
+        suffix = self.values.get(value)
+        if suffix is None:
+            suffix = _value_suffix(value)
+            # parameter values are small ranges, but don't let odd callers grow the table forever
+            if len(self.values) < 65536:
+                self.values[value] = suffix
+        return prefix + suffix
+
+
+    def query(self, channel, param):
+        message = self.query_templates.get((channel, param))
+        if message is None:
+            message = self.query_templates[(channel, param)] = bytes(
+                (0xF0, 0x43, 0x30, 0x3E, 0x14, 0x01, 0x04, 0x02, 0x00, (param >> 7) & 0x7F, param & 0x7F, 0x00, 0x00, channel, 0xF7))
+        return message
+
+
+    def changes(self, changes):
+        '''
+            Encode {(channel, param): value} (or (key, value) pairs) into one contiguous
+            buffer of back to back change messages. Every change message is CHANGE_SIZE bytes.
+        '''
+        if isinstance(changes, dict):
+            changes = changes.items()
+        change = self.change
+        return b''.join([change(channel, param, value) for (channel, param), value in changes])
+
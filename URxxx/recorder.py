@@ -0,0 +1,160 @@
+from collections import namedtuple
+import mmap
+import struct
+import threading
+import time
+
+INCOMING = 0
+OUTGOING = 1
+
+MAGIC = b'URREC\x00\x01\x00'
+# magic, wall clock time of the start (seconds since the epoch)
+HEADER = struct.Struct('<8sd')
+# nanoseconds since the start (monotonic), direction, length of the message
+RECORD = struct.Struct('<QBH')
+
+
+class Record(namedtuple('Record', 'time direction message')):
+    # time is in seconds since the start of the recording, message is bytes
+    __slots__ = ()
+
+
+class Recorder():
+    '''
+        Append-only log of the MIDI traffic of a device, for reproducing field problems.
+
+        File layout (little endian): a header of magic + start time (double, epoch seconds),
+        then one record per message: u64 nanoseconds since start (monotonic clock), u8
+        direction (INCOMING / OUTGOING), u16 length, the message bytes. Records are never
+        rewritten, a log cut short by a crash is readable up to the last complete record.
+
+            recorder = ur44c.StartRecording('stage.urrec')
+            ...
+            ur44c.StopRecording()
+            for record in RecordLog('stage.urrec'):
+                print(record.time, record.direction, record.message.hex())
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'wb')
+        self.lock = threading.Lock()
+        self.started = time.monotonic_ns()
+        self.count = 0
+        self.file.write(HEADER.pack(MAGIC, time.time()))
+
+
+    def record(self, direction, message):
+        # called from the MIDI thread and any sending thread
+        now = time.monotonic_ns()
+        message = bytes(message)
+        with self.lock:
+            if self.file is None:
+                return
+            self.file.write(RECORD.pack(now - self.started, direction, len(message)))
+            self.file.write(message)
+            self.count += 1
+
+
+    def flush(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.flush()
+
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class RecordLog():
+    '''
+        Reads a log written by Recorder through mmap, so it costs no memory whatever its
+        size. Iterating yields Records in the order they were written.
+    '''
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.map) < HEADER.size:
+            raise ValueError(f'{path}: not a traffic log')
+        magic, self.start_time = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            raise ValueError(f'{path}: not a traffic log')
+
+
+    def __iter__(self):
+        data = self.map
+        size = len(data)
+        offset = HEADER.size
+        while offset + RECORD.size <= size:
+            ns, direction, length = RECORD.unpack_from(data, offset)
+            offset += RECORD.size
+            if offset + length > size:
+                # the last record didn't make it to the disk completely
+                return
+            yield Record(ns / 1e9, direction, data[offset:offset+length])
+            offset += length
+
+
+    def close(self):
+        self.map.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def replay(records, deliver, direction, speed=1.0):
+    '''
+        deliver(message, delta) for every record in `direction`, delta being the seconds since
+        the previous one. With a speed the original timing is reproduced (2.0 = twice as fast),
+        with speed=None messages go out back to back. Returns the number of messages.
+    '''
+    started = time.monotonic()
+    first = last = None
+    count = 0
+    for record in records:
+        if record.direction != direction:
+            continue
+        if first is None:
+            first = last = record.time
+        if speed:
+            delay = started + (record.time - first) / speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        deliver(record.message, record.time - last)
+        last = record.time
+        count += 1
+    return count
+
+
+def replay_to_device(records, device, speed=1.0):
+    '''
+        Feed the recorded incoming traffic into a UR44C (or subclass) as if it came from
+        the port: cache, router, meters, stats and listeners all see it.
+    '''
+    return replay(records, lambda message, delta: device._midi_callback((list(message), delta), device),
+                  INCOMING, speed)
+
+
+def replay_to_emulator(records, emulator, speed=1.0):
+    '''
+        Send the recorded outgoing traffic to a UR44C_emulator (or any midi_out).
+    '''
+    midi_out = getattr(emulator, 'midi_out', emulator)
+    return replay(records, lambda message, delta: midi_out.send_message(message), OUTGOING, speed)
@@ -0,0 +1,161 @@
+from array import array
+import functools
+import re
+
+from URxxx.params import *
+
+
+UR44C_UNITS = {
+    'mixer': UR44C_Params_Mixer,
+    'chstrip': UR44C_Params_ChStrip,
+    'clean': UR44C_Params_Clean,
+    'crunch': UR44C_Params_Crunch,
+    'lead': UR44C_Params_Lead,
+    'drive': UR44C_Params_Drive,
+    'pitchfix': UR44C_Params_PitchFix,
+    'hall': UR44C_Params_Hall,
+    'room': UR44C_Params_Room,
+    'plate': UR44C_Params_Plate,
+    'delay': UR44C_Params_Delay,
+    'ducker': UR44C_Params_Ducker,
+    'mbcomp': UR44C_Params_MBComp,
+}
+
+MODEL_UNITS = {
+    'UR44C': UR44C_UNITS,
+    'UR22C': UR44C_UNITS,
+}
+
+
+def _note_channels(notes):
+    # channels a note limits a parameter to ("ch0-ch3 only", "ch0, ch2, ch4 only",
+    # "set on ch3", "ch1:DAW, ch2:Music, ch3:Voice"), None when it doesn't
+    if not notes or not re.search(r'\bch\d', notes):
+        return None
+    channels = set()
+    for first, last in re.findall(r'\bch(\d+)-ch(\d+)', notes):
+        channels.update(range(int(first), int(last) + 1))
+    channels.update(int(channel) for channel in re.findall(r'\bch(\d+)\b(?!-)', notes))
+    return frozenset(channels)
+
+
+class ParameterRegistry():
+    '''
+        Parameter tables of a model compiled into indexes.
+
+        Every (unit, name) gets an index i. ids/mins/maxs/defaults are parallel arrays over i,
+        by_name maps (unit, name) -> i (unit may be the params class or its unit name) and
+        by_id maps a parameter number -> [i, ...], several units share numbers
+        (e.g. 111, 113, 115, 200, 201 in Clean/Crunch/Lead/Drive). limits[i] is the set of
+        channels the notes restrict a parameter to, None if it isn't restricted.
+    '''
+
+    def __init__(self, units):
+        self.units = dict(units)
+        self.unit_names = {unit: unit_name for unit_name, unit in self.units.items()}
+        self.entries = []
+        self.descriptions = []
+        self.ids = array('i')
+        self.mins = array('i')
+        self.maxs = array('i')
+        self.defaults = array('i')
+        self.has_default = bytearray()
+        self.limits = []
+        self.by_name = {}
+        self.by_id = {}
+
+        for unit_name, unit in self.units.items():
+            for name, attr in vars(unit).items():
+                if name.startswith('__'):
+                    continue
+                param_num, min_val, max_val, def_val, val_descr, notes = attr
+                i = len(self.entries)
+                self.entries.append((unit, name))
+                self.descriptions.append((val_descr, notes))
+                self.ids.append(param_num)
+                self.mins.append(min_val)
+                self.maxs.append(max_val)
+                self.defaults.append(def_val if def_val is not None else 0)
+                self.has_default.append(def_val is not None)
+                self.limits.append(_note_channels(notes))
+                self.by_name[(unit, name)] = i
+                self.by_name[(unit_name, name)] = i
+                self.by_id.setdefault(param_num, []).append(i)
+
+
+    def __len__(self):
+        return len(self.entries)
+
+
+    def unit(self, unit):
+        # accepts the params class or its unit name
+        return self.units[unit] if isinstance(unit, str) else unit
+
+
+    def index(self, unit, name):
+        try:
+            return self.by_name[(unit, name)]
+        except KeyError:
+            raise AttributeError(f'Unknown parameter {name} in {getattr(unit, "__name__", unit)}') from None
+
+
+    def lookup(self, unit, name):
+        '''
+            (param_num, min_val, max_val, def_val) of a parameter.
+        '''
+        i = self.index(unit, name)
+        return self.ids[i], self.mins[i], self.maxs[i], self.default(i)
+
+
+    def default(self, i):
+        return self.defaults[i] if self.has_default[i] else None
+
+
+    def describe(self, i):
+        '''
+            The original params tuple (param_num, min, max, default, values explain, notes).
+        '''
+        return (self.ids[i], self.mins[i], self.maxs[i], self.default(i)) + self.descriptions[i]
+
+
+    def parameters(self, unit):
+        '''
+            Indexes of the parameters of a unit in declaration order.
+        '''
+        unit = self.unit(unit)
+        return [i for i, entry in enumerate(self.entries) if entry[0] is unit]
+
+
+    def names(self, param):
+        '''
+            Every (unit name, parameter name) that uses a parameter number.
+        '''
+        return [(self.unit_names[self.entries[i][0]], self.entries[i][1]) for i in self.by_id.get(param, ())]
+
+
+    def channels(self, param, num_inputs):
+        '''
+            Channels a parameter number is valid on. A number shared by several units is
+            valid wherever one of them is.
+        '''
+        channels = set()
+        for i in self.by_id.get(param, ()):
+            limit = self.limits[i]
+            if limit is None:
+                return range(num_inputs)
+            channels.update(limit)
+        return sorted(channel for channel in channels if channel < num_inputs)
+
+
+    def validate(self, indices, values):
+        '''
+            Positions in a batch whose value is out of range.
+        '''
+        mins = self.mins
+        maxs = self.maxs
+        return [pos for pos, (i, value) in enumerate(zip(indices, values)) if not mins[i] <= value <= maxs[i]]
+
+
+@functools.lru_cache(maxsize=None)
+def get_registry(model='UR44C'):
+    return ParameterRegistry(MODEL_UNITS[model])
@@ -0,0 +1,169 @@
+import threading
+
+
+class PendingRequest():
+    '''
+        One query on the wire for a (channel, param). Every caller interested in the same
+        key while it is in flight shares it.
+    '''
+    __slots__ = ('key', 'event', 'done', 'value', 'failed', 'waiters', 'callbacks')
+
+    def __init__(self, key):
+        self.key = key
+        self.event = threading.Event()
+        self.done = False
+        self.value = None
+        self.failed = False
+        self.waiters = 0
+        self.callbacks = []
+
+
+class RequestRouter():
+    '''
+        Matches parameter replies to the callers waiting for them, safe for any number of
+        threads.
+
+        Requests are kept per (channel, param) in the order they went out and a reply
+        completes the oldest one, the device answers queries in order. request() joins the
+        newest in-flight request of a key instead of sending a duplicate query, unless force
+        is set (e.g. to confirm a change the older query could have missed).
+
+        A request is dropped when its last waiter gives up (timeout or cancel), so a lost
+        reply doesn't shift later replies onto the wrong request. fail_all() completes
+        everything at once with no value, for connection loss; while `offline` is set new
+        requests fail right away without touching the wire.
+
+            value = router.get(channel, param, timeout)
+
+        or, for many keys at once, request() each and wait on router.cond for `done`, or
+        add_callback() to be told without a thread (AsyncUR44C).
+    '''
+
+    def __init__(self, send_query):
+        # send_query(param, channel) puts a query on the wire
+        self.send_query = send_query
+        self.cond = threading.Condition(threading.RLock())
+        self.pending = {}
+        self.offline = False
+
+
+    def request(self, channel, param, force=False):
+        key = (channel, param)
+        with self.cond:
+            if self.offline:
+                request = PendingRequest(key)
+                request.failed = request.done = True
+                request.event.set()
+                request.waiters += 1
+                return request
+            requests = self.pending.get(key)
+            if requests and not force:
+                request = requests[-1]
+            else:
+                request = PendingRequest(key)
+                requests = self.pending.setdefault(key, [])
+                requests.append(request)
+                # under the lock, so the queue order is the wire order
+                try:
+                    self.send_query(param, channel)
+                except BaseException:
+                    # never went out, no reply will come for it
+                    requests.remove(request)
+                    if not requests:
+                        del self.pending[key]
+                    raise
+            request.waiters += 1
+        return request
+
+
+    def resolve(self, channel, param, value):
+        '''
+            Reply from the device. Returns False if nobody was waiting for it.
+        '''
+        key = (channel, param)
+        with self.cond:
+            requests = self.pending.get(key)
+            if not requests:
+                return False
+            request = requests.pop(0)
+            if not requests:
+                del self.pending[key]
+            request.value = value
+            request.done = True
+            request.event.set()
+            self.cond.notify_all()
+            self._run_callbacks(request)
+        return True
+
+
+    def add_callback(self, request, callback):
+        '''
+            callback(request) once the request completes, right away if it already has.
+            Called with the router lock held, it must not block.
+        '''
+        with self.cond:
+            if request.done:
+                callback(request)
+            else:
+                request.callbacks.append(callback)
+
+
+    def _run_callbacks(self, request):
+        callbacks, request.callbacks = request.callbacks, []
+        for callback in callbacks:
+            callback(request)
+
+
+    def release(self, request):
+        '''
+            A waiter gives up on a request. Returns its value if it completed meanwhile.
+        '''
+        with self.cond:
+            request.waiters -= 1
+            if not request.done and request.waiters <= 0:
+                requests = self.pending.get(request.key)
+                if requests and request in requests:
+                    requests.remove(request)
+                    if not requests:
+                        del self.pending[request.key]
+            return request.value
+
+
+    def wait(self, request, timeout=None):
+        '''
+            Value of the request, None on timeout or failure.
+        '''
+        request.event.wait(timeout)
+        return self.release(request)
+
+
+    def get(self, channel, param, timeout=None, force=False):
+        return self.wait(self.request(channel, param, force), timeout)
+
+
+    def cancel(self, request):
+        self.release(request)
+
+
+    def fail_all(self):
+        '''
+            Complete every pending request without a value, callbacks included (async
+            waiters). Returns how many were pending.
+        '''
+        with self.cond:
+            pending, self.pending = self.pending, {}
+            count = 0
+            for requests in pending.values():
+                for request in requests:
+                    request.failed = True
+                    request.done = True
+                    request.event.set()
+                    self._run_callbacks(request)
+                    count += 1
+            self.cond.notify_all()
+        return count
+
+
+    def in_flight(self):
+        with self.cond:
+            return sum(len(requests) for requests in self.pending.values())
@@ -0,0 +1,120 @@
+import threading
+import time
+
+
+class PendingWrite():
+    '''
+        Handle returned by WriteScheduler.set(). wait() blocks until the value, or a newer
+        one that replaced it, was written and returns whether the device confirmed it.
+    '''
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.ok = None
+
+
+    def done(self, ok):
+        self.ok = ok
+        self.event.set()
+
+
+    def wait(self, timeout=None):
+        if not self.event.wait(timeout):
+            return None
+        return self.ok
+
+
+class WriteScheduler():
+    '''
+        Non-blocking, coalescing write path.
+
+        set() only records the value; a background thread sends it with SetParameterByName
+        at no more than `rate` writes per second. While a write is waiting, newer values for
+        the same (channel, param) replace it, so dragging a fader sends just the latest position.
+        Failed confirmations are reported to on_failure(unit, name, value, input) from the
+        writer thread. set() returns a PendingWrite for callers that need the outcome.
+    '''
+
+    def __init__(self, device, rate=50, on_failure=None, on_success=None):
+        self.device = device
+        self.interval = 1.0 / rate if rate else 0
+        self.on_failure = on_failure
+        self.on_success = on_success
+
+        self.pending = {}
+        self.busy = False
+        self.running = True
+        self.cond = threading.Condition()
+        self.thread = threading.Thread(target=self._run, name='WriteScheduler', daemon=True)
+        self.thread.start()
+
+
+    def set(self, unit, name, value, input=0):
+        param_num = self.device.registry.lookup(unit, name)[0]
+        key = (input, param_num)
+        write = PendingWrite()
+        with self.cond:
+            # re-insert so the dict keeps the order in which keys last changed
+            previous = self.pending.pop(key, None)
+            writes = previous[4] if previous else []
+            writes.append(write)
+            self.pending[key] = (unit, name, value, input, writes)
+            self.cond.notify_all()
+        return write
+
+
+    def flush(self, timeout=None):
+        '''
+            Wait until every pending write went out. Returns False on timeout.
+        '''
+        with self.cond:
+            return self.cond.wait_for(lambda: not self.pending and not self.busy, timeout)
+
+
+    def stop(self, flush=True, timeout=None):
+        if flush:
+            self.flush(timeout)
+        with self.cond:
+            self.running = False
+            dropped = list(self.pending.values())
+            self.pending.clear()
+            self.cond.notify_all()
+        for unit, name, value, input, writes in dropped:
+            for write in writes:
+                write.done(False)
+        self.thread.join(timeout)
+
+
+    def _run(self):
+        next_write = 0
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self.pending or not self.running)
+                if not self.running:
+                    return
+                delay = next_write - time.monotonic()
+                if delay > 0:
+                    # rate limit, newer values keep coalescing meanwhile
+                    self.cond.wait(delay)
+                    continue
+                key = next(iter(self.pending))
+                unit, name, value, input, writes = self.pending.pop(key)
+                self.busy = True
+
+            try:
+                ok = self.device.SetParameterByName(unit, name, value, input)
+            except Exception:
+                ok = False
+            next_write = time.monotonic() + self.interval
+
+            if ok:
+                if self.on_success:
+                    self.on_success(unit, name, value, input)
+            elif self.on_failure:
+                self.on_failure(unit, name, value, input)
+            for write in writes:
+                write.done(ok)
+
+            with self.cond:
+                self.busy = False
+                self.cond.notify_all()
@@ -0,0 +1,78 @@
+'''
+    Full device snapshots.
+
+    File format (little endian), version 1:
+        header: b'URSN', version u8, model (8 bytes, NUL padded), record count u32
+        records: channel u8, parameter u16, value i32
+'''
+
+import struct
+
+MAGIC = b'URSN'
+VERSION = 1
+
+_HEADER = struct.Struct('<4sB8sI')
+_RECORD = struct.Struct('<BHi')
+
+
+def snapshot_keys(device):
+    '''
+        Every (channel, parameter) known to the device registry, on the channels the
+        parameter is valid on. Parameter numbers shared by several units are read only once.
+    '''
+    registry = device.registry
+    keys = [(channel, param) for param in registry.by_id for channel in registry.channels(param, device.num_inputs)]
+    return sorted(keys)
+
+
+def read_snapshot(device, window=16, check_timeout=1):
+    '''
+        Read the whole device state with pipelined queries.
+        Returns {(channel, parameter): value}; parameters the device didn't answer are left out.
+        A query the device ignores costs check_timeout, so it is kept short: replies come
+        within milliseconds.
+    '''
+    values = device.QueryParameters(snapshot_keys(device), window, check_timeout, use_cache=False)
+    return {key: value for key, value in values.items() if value is not None}
+
+
+def save_snapshot(path, model, values):
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, model.encode(), len(values)))
+        for (channel, param), value in sorted(values.items()):
+            f.write(_RECORD.pack(channel, param, value))
+
+
+def load_snapshot(path):
+    '''
+        Returns (model, {(channel, parameter): value}).
+    '''
+    with open(path, 'rb') as f:
+        data = f.read()
+    magic, version, model, count = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f'{path} is not a snapshot file')
+    if version != VERSION:
+        raise ValueError(f'Unsupported snapshot version {version}')
+    values = {}
+    for channel, param, value in _RECORD.iter_unpack(data[_HEADER.size:_HEADER.size + count*_RECORD.size]):
+        values[(channel, param)] = value
+    return model.rstrip(b'\0').decode(), values
+
+
+def restore_snapshot(device, values, window=16, check_timeout=3):
+    '''
+        Write only the parameters whose current device value differs from the snapshot.
+        Returns {'unchanged': [...], 'changed': [...], 'failed': [...]} lists of (channel, parameter).
+    '''
+    current = device.QueryParameters(values.keys(), window, check_timeout, use_cache=False)
+    report = {'unchanged': [], 'changed': [], 'failed': []}
+    changes = {}
+    for key, value in values.items():
+        if current.get(key) == value:
+            report['unchanged'].append(key)
+        else:
+            changes[key] = value
+    for key, result in device.WriteParameters(changes, window, check_timeout).items():
+        report['changed' if result.ok else 'failed'].append(key)
+    return report
@@ -0,0 +1,209 @@
+'''
+    Message counters and latency histograms of a device connection.
+
+    The device only calls into DeviceStats when ur44c.stats is set (EnableStats), so a
+    disabled connection pays one attribute check per message.
+'''
+
+from array import array
+import threading
+import time
+
+# bucket i counts latencies in [2^(i-1), 2^i) microseconds, the last one everything above
+BUCKETS = 26
+
+
+class LatencyHistogram():
+
+    def __init__(self):
+        self.counts = array('Q', bytes(8 * BUCKETS))
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+
+    def add(self, seconds):
+        self.counts[min(int(seconds * 1e6).bit_length(), BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if self.max is None or seconds > self.max:
+            self.max = seconds
+
+
+    def percentile(self, p):
+        '''
+            Upper bound of the bucket holding the p-th percentile (0..100), in seconds.
+        '''
+        if not self.count:
+            return None
+        rank = p / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= rank:
+                return min((1 << i) / 1e6, self.max)
+        return self.max
+
+
+    def as_dict(self):
+        if not self.count:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'mean': self.total / self.count,
+            'min': self.min,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+        }
+
+
+class DeviceStats():
+    '''
+        Counters per message type and per parameter number:
+
+        sent / received             messages by type (protocol message type names)
+        timeouts / mismatches       by operation ('get', 'set', 'query'), and by parameter
+        latency                     query -> reply time by parameter and overall ('reply'),
+                                    whole GetParameter/SetParameter calls ('get', 'set')
+        meter frames                count and average rate
+    '''
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+
+    def reset(self):
+        with self.lock:
+            self.started = time.monotonic()
+            self.sent = {}
+            self.received = {}
+            self.timeouts = {}
+            self.mismatches = {}
+            self.parameters = {}
+            self.latency = {}
+            self.outstanding = {}
+            self.meter_frames = 0
+            self.meter_first = None
+            self.meter_last = None
+
+
+    def _parameter(self, parameter):
+        counters = self.parameters.get(parameter)
+        if counters is None:
+            counters = self.parameters[parameter] = {'queries': 0, 'replies': 0, 'changes': 0, 'timeouts': 0, 'mismatches': 0,
+                                                     'latency': LatencyHistogram()}
+        return counters
+
+
+    def _histogram(self, name):
+        histogram = self.latency.get(name)
+        if histogram is None:
+            histogram = self.latency[name] = LatencyHistogram()
+        return histogram
+
+
+    def message_sent(self, type, channel=None, parameter=None):
+        with self.lock:
+            self.sent[type] = self.sent.get(type, 0) + 1
+            if type == 'query-parameter':
+                self._parameter(parameter)['queries'] += 1
+                # the reply closes the round trip, a repeated query restarts it
+                self.outstanding[(channel, parameter)] = time.monotonic()
+            elif type == 'change-parameter':
+                self._parameter(parameter)['changes'] += 1
+
+
+    def message_received(self, message):
+        now = time.monotonic()
+        with self.lock:
+            type = message.type
+            self.received[type] = self.received.get(type, 0) + 1
+            if type == 'reply-parameter':
+                counters = self._parameter(message.param)
+                counters['replies'] += 1
+                sent = self.outstanding.pop((message.channel, message.param), None)
+                if sent is not None:
+                    counters['latency'].add(now - sent)
+                    self._histogram('reply').add(now - sent)
+            elif type == 'meters':
+                self.meter_frames += 1
+                if self.meter_first is None:
+                    self.meter_first = now
+                self.meter_last = now
+
+
+    def operation(self, operation, elapsed):
+        with self.lock:
+            self._histogram(operation).add(elapsed)
+
+
+    def timeout(self, operation, channel, parameter):
+        with self.lock:
+            self.timeouts[operation] = self.timeouts.get(operation, 0) + 1
+            self._parameter(parameter)['timeouts'] += 1
+            self.outstanding.pop((channel, parameter), None)
+
+
+    def mismatch(self, operation, parameter):
+        with self.lock:
+            self.mismatches[operation] = self.mismatches.get(operation, 0) + 1
+            self._parameter(parameter)['mismatches'] += 1
+
+
+    def meter_rate(self):
+        if self.meter_frames < 2 or self.meter_last == self.meter_first:
+            return None
+        return (self.meter_frames - 1) / (self.meter_last - self.meter_first)
+
+
+    def snapshot(self):
+        '''
+            Everything as plain dicts (JSON serializable), latencies in seconds.
+        '''
+        with self.lock:
+            return {
+                'elapsed': time.monotonic() - self.started,
+                'sent': dict(self.sent),
+                'received': dict(self.received),
+                'timeouts': dict(self.timeouts),
+                'mismatches': dict(self.mismatches),
+                'latency': {name: histogram.as_dict() for name, histogram in self.latency.items()},
+                'parameters': {parameter: dict(counters, latency=counters['latency'].as_dict())
+                               for parameter, counters in sorted(self.parameters.items())},
+                'meter_frames': self.meter_frames,
+                'meter_rate': self.meter_rate(),
+            }
+
+
+def format_stats(stats, names=None):
+    '''
+        Human readable report of a DeviceStats.snapshot(). names(parameter) may return
+        [(unit, name), ...] to label parameter numbers.
+    '''
+    ms = lambda seconds: f'{seconds*1000:.2f}ms' if seconds is not None else '-'
+    lines = [f"Elapsed {stats['elapsed']:.1f}s"]
+    for title, counters in (('Sent', stats['sent']), ('Received', stats['received']),
+                            ('Timeouts', stats['timeouts']), ('Mismatches', stats['mismatches'])):
+        if counters:
+            lines.append(f'{title}: ' + ', '.join(f'{key} {value}' for key, value in sorted(counters.items())))
+    for name, latency in sorted(stats['latency'].items()):
+        if latency['count']:
+            lines.append(f"Latency {name}: n={latency['count']} mean={ms(latency['mean'])} p50<={ms(latency['p50'])} "
+                         f"p95<={ms(latency['p95'])} p99<={ms(latency['p99'])} max={ms(latency['max'])}")
+    if stats['meter_frames']:
+        rate = stats['meter_rate']
+        lines.append(f"Meter frames: {stats['meter_frames']}" + (f', {rate:.1f}/s' if rate else ''))
+    if stats['parameters']:
+        lines.append('PARAM  QUERIES REPLIES CHANGES TIMEOUTS MISMATCH    P50      MAX  NAMES')
+        for parameter, counters in stats['parameters'].items():
+            label = ', '.join(f'{unit}.{name}' for unit, name in names(int(parameter))) if names else ''
+            latency = counters['latency']
+            lines.append(f"{parameter:>5} {counters['queries']:>8} {counters['replies']:>7} {counters['changes']:>7} "
+                         f"{counters['timeouts']:>8} {counters['mismatches']:>8} {ms(latency.get('p50')):>8} {ms(latency.get('max')):>8}  {label}")
+    return '\n'.join(lines)
@@ -1,6 +1,8 @@
 from URxxx.ur44c import UR44C
 
 class UR22C(UR44C):
-    def __init__(self, midi_in, midi_out):
-        super().__init__(midi_in, midi_out)
+    model = 'UR22C'
+
+    def __init__(self, midi_in, midi_out, settle_time=0.1):
+        super().__init__(midi_in, midi_out, settle_time)
         self.num_inputs = 2
@@ -0,0 +1,132 @@
+import asyncio
+
+from URxxx.recorder import INCOMING
+from URxxx.ur44c import UR44C
+
+
+def _set_result(future, request):
+    if not future.done():
+        future.set_result(None if request.failed else request.value)
+
+
+class AsyncUR44C(UR44C):
+    '''
+        asyncio flavour of UR44C. Must be created from a running event loop.
+
+        The rtmidi callback thread only hands incoming messages to the loop with
+        call_soon_threadsafe, waiting for replies costs a future instead of a thread.
+        Queries go through the same RequestRouter as the blocking API, so the inherited
+        methods (GetParameter, QueryParameters, snapshots, ...) keep working from other
+        threads; called from the event loop itself they would block it.
+
+            dev = AsyncUR44C(midi_in, midi_out)
+            value = await dev.get(UR44C_Params_Mixer, 'InputMix1Volume', 0)
+            ok = await dev.set(UR44C_Params_Mixer, 'InputMix1Volume', 103, 0)
+            async for event in dev.events():
+                ...
+    '''
+
+    def __init__(self, midi_in, midi_out, loop=None, queue_size=1000):
+        self.loop = loop or asyncio.get_running_loop()
+        self.subscribers = set()
+        self.queue_size = queue_size
+        super().__init__(midi_in, midi_out, settle_time=0)
+
+
+    def _midi_callback(self, event, obj=None):
+        # recorded here, in the MIDI thread, for the timestamp
+        if self.recorder is not None:
+            self.recorder.record(INCOMING, event[0])
+        self.loop.call_soon_threadsafe(self._dispatch, event)
+
+
+    def _dispatch(self, event):
+        # runs in the event loop thread
+        message, timestamp = event
+        res = self._sysex_parser(message)
+        if self.stats is not None:
+            self.stats.message_received(res)
+        if res.type in ('reply-parameter', 'change-parameter') and self.cache is not None:
+            self.cache.update(res.channel, res.param, res.value)
+
+        if res.type=='reply-parameter':
+            self.router.resolve(res.channel, res.param, res.value)
+        elif res.type=='meters':
+            self.meters.push(res.data)
+
+        if res.type!='unknown':
+            for listener in self.listeners:
+                listener(res)
+            for queue in self.subscribers:
+                try:
+                    queue.put_nowait(res)
+                except asyncio.QueueFull:
+                    # slow consumer, drop the event rather than stall everybody else
+                    pass
+
+
+    async def query(self, parameter, channel=0, timeout=3, max_age=None, force=False):
+        '''
+            Await the value of a parameter. Concurrent queries for the same (channel, parameter)
+            share a single wire request unless force is set.
+        '''
+        if self.cache is not None and not force:
+            value = self.cache.get(channel, parameter, max_age)
+            if value is not None:
+                return value
+
+        future = self.loop.create_future()
+
+        def completed(request):
+            # from the loop thread for replies, from the heartbeat thread on connection loss
+            try:
+                self.loop.call_soon_threadsafe(_set_result, future, request)
+            except RuntimeError:
+                # the loop is closed, nobody is awaiting anymore
+                pass
+
+        request = self.router.request(channel, parameter, force)
+        self.router.add_callback(request, completed)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            if self.stats is not None:
+                self.stats.timeout('get', channel, parameter)
+            return None
+        finally:
+            self.router.release(request)
+
+
+    async def change(self, parameter, value, channel=0, confirm=True, timeout=3):
+        self.MIDISendChangeParameterValue(parameter, value, channel)
+        if confirm:
+            return await self.query(parameter, channel, timeout, force=True) == value
+        if self.cache is not None:
+            self.cache.invalidate(channel, parameter)
+        return True
+
+
+    async def get(self, unit, name, input=0, timeout=3, max_age=None):
+        i = self.registry.index(unit, name)
+        assert 0 <= input < self.num_inputs
+        return await self.query(self.registry.ids[i], input, timeout, max_age)
+
+
+    async def set(self, unit, name, value, input=0, confirm=True, timeout=3):
+        i = self.registry.index(unit, name)
+        assert self.registry.mins[i] <= value <= self.registry.maxs[i]
+        assert 0 <= input < self.num_inputs
+        return await self.change(self.registry.ids[i], value, input, confirm, timeout)
+
+
+    async def events(self):
+        '''
+            Async iterator over parsed incoming messages (replies, changes, keepalives, meters).
+        '''
+        queue = asyncio.Queue(self.queue_size)
+        self.subscribers.add(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self.subscribers.discard(queue)
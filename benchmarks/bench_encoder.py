@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+'''
+    Outgoing message encoding: the list building encoder UR44C used before against the
+    template Encoder, single messages and a scene recall sized batch.
+
+        python3 -m benchmarks.bench_encoder [-n NUMBER] [--batch SIZE]
+'''
+
+import argparse
+import timeit
+
+from URxxx import protocol
+from URxxx.ur44c import UR44C
+
+
+def legacy_change(parameter, value, channel=0):
+    p0 = (parameter >> 7*0) & 0x7F
+    p1 = (parameter >> 7*1) & 0x7F
+    v32 = value & 0xFFFFFFFF
+    v0 = (v32 >> 7*0) & 0x7F
+    v1 = (v32 >> 7*1) & 0x7F
+    v2 = (v32 >> 7*2) & 0x7F
+    v3 = (v32 >> 7*3) & 0x7F
+    v4 = (v32 >> 7*4) & 0x7F
+    return [0xF0, 0x43, 0x10, 0x3E, 0x14, 0x01, 0x01, 0x00, p1, p0, 0x00, 0x00, channel, v4, v3, v2, v1, v0, 0xF7]
+
+
+def legacy_query(parameter, channel=0):
+    p0 = (parameter >> 7*0) & 0x7F
+    p1 = (parameter >> 7*1) & 0x7F
+    return [0xF0, 0x43, 0x30, 0x3E, 0x14, 0x01, 0x04, 0x02, 0x00, p1, p0, 0x00, 0x00, channel, 0xF7]
+
+
+class NullIn():
+    def ignore_types(self, **kwargs):
+        pass
+
+    def set_callback(self, callback, data=None):
+        pass
+
+
+class NullOut():
+    def __init__(self, multi_sysex=False):
+        self.multi_sysex = multi_sysex
+        self.calls = 0
+
+    def send_message(self, message):
+        self.calls += 1
+
+
+def per_call(function, number):
+    return min(timeit.Timer(function).repeat(repeat=5, number=number)) / number * 1e9
+
+
+def run(number, batch):
+    encoder = protocol.Encoder()
+    assert bytes(legacy_change(300, -5, 2)) == encoder.change(2, 300, -5)
+    assert bytes(legacy_query(300, 2)) == encoder.query(2, 300)
+
+    results = {
+        'change legacy': per_call(lambda: legacy_change(12, 103, 2), number),
+        'change template': per_call(lambda: encoder.change(2, 12, 103), number),
+        'query legacy': per_call(lambda: legacy_query(12, 2), number),
+        'query template': per_call(lambda: encoder.query(2, 12), number),
+    }
+
+    # a scene recall sized batch of distinct parameters
+    changes = {(param % 6, param): param % 100 for param in range(batch)}
+    out = NullOut()
+
+    def legacy_batch():
+        for (channel, param), value in changes.items():
+            out.send_message(legacy_change(param, value, channel))
+
+    device = UR44C(NullIn(), NullOut(), settle_time=0)
+    vectored = UR44C(NullIn(), NullOut(multi_sysex=True), settle_time=0)
+    number = max(1, number // batch)
+    results[f'batch {len(changes)} legacy'] = per_call(legacy_batch, number) / len(changes)
+    results[f'batch {len(changes)} SendChanges'] = per_call(lambda: device.SendChanges(changes), number) / len(changes)
+    results[f'batch {len(changes)} SendChanges vectored'] = per_call(lambda: vectored.SendChanges(changes), number) / len(changes)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sysex encoder benchmark')
+    parser.add_argument('--number', '-n', type=int, default=100000, help='Messages per measurement')
+    parser.add_argument('--batch', type=int, default=1000, help='Changes per batch')
+    args = parser.parse_args()
+
+    for name, ns in run(args.number, args.batch).items():
+        print(f'{name:<32} {ns:>8.1f} ns/message')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+
+'''
+    Microbenchmark of the sysex parser: ns/message for every message type, either for the
+    synthetic messages below or for the incoming traffic of a recorded session. With
+    --compare the synthetic messages also go through legacy_parse, the slice-and-compare
+    parser protocol.parse replaced, for an old vs new comparison.
+
+        python3 -m benchmarks.bench_parser [-n NUMBER] [--log FILE] [--compare]
+'''
+
+import argparse
+from collections import Counter
+import time
+import timeit
+
+from URxxx import protocol
+from URxxx import recorder
+
+
+MESSAGES = {
+    'change-parameter': [0xF0, 0x43, 0x10, 0x3E, 0x14, 0x01, 0x01, 0x00, 0x00, 0x0C, 0x00, 0x00, 0x02, 0x0F, 0x7F, 0x7F, 0x7F, 0x70, 0xF7],
+    'query-parameter': [0xF0, 0x43, 0x30, 0x3E, 0x14, 0x01, 0x04, 0x02, 0x00, 0x00, 0x0C, 0x00, 0x00, 0x02, 0xF7],
+    'reply-parameter': [0xF0, 0x43, 0x10, 0x3E, 0x14, 0x01, 0x04, 0x02, 0x00, 0x00, 0x0C, 0x00, 0x00, 0x02, 0x00, 0x00, 0x00, 0x00, 0x67, 0xF7],
+    'keepalive': [0xF0, 0x43, 0x10, 0x3E, 0x14, 0x00, 0x04, 0x02, 0xF7],
+    'meters': [0xF0, 0x43, 0x10, 0x3E, 0x14, 0x02, 0x03] + [0x76, 0x02, 0x7F, 0x40] * protocol.METER_COUNT + [0xF7],
+    'unknown': [0xF0, 0x43, 0x10, 0x3E, 0x14, 0x00, 0x70, 0x02, 0x00, 0xF7],
+}
+
+
+def legacy_parse(message):
+    '''
+        The parser before URxxx.protocol (UR44C._sysex_parser), kept as the baseline. Meter
+        frames are only recognized, as protocol.parse does; the old one decoded them as well.
+    '''
+    if len(message)==19 and message[:8]==[0xF0, 0x43, 0x10, 0x3E, 0x14, 0x01, 0x01, 0x00]:
+        param = message[8]*128 + message[9]
+        channel = message[12]
+        v32 = message[13]*(128**4) + message[14]*(128**3) + message[15]*(128**2) + message[16]*128 + message[17]
+        value = (v32 & 0x7FFFFFFF) - (v32 & 0x80000000)
+        return {'type': 'change-parameter', 'channel': channel, 'param': param, 'value': value}
+    elif len(message)==15 and message[:9]==[0xF0, 0x43, 0x30, 0x3E, 0x14, 0x01, 0x04, 0x02, 0x00]:
+        param = message[9]*128 + message[10]
+        channel = message[13]
+        return {'type': 'query-parameter', 'channel': channel, 'param': param}
+    elif len(message)==20 and message[:9]==[0xF0, 0x43, 0x10, 0x3E, 0x14, 0x01, 0x04, 0x02, 0x00]:
+        param = message[9]*128 + message[10]
+        channel = message[13]
+        v32 = message[14]*(128**4) + message[15]*(128**3) + message[16]*(128**2) + message[17]*128 + message[18]
+        value = (v32 & 0x7FFFFFFF) - (v32 & 0x80000000)
+        return {'type': 'reply-parameter', 'channel': channel, 'param': param, 'value': value}
+    elif message==[0xF0, 0x43, 0x10, 0x3E, 0x14, 0x00, 0x04, 0x02, 0xF7]:
+        return {'type': 'keepalive'}
+    elif message[0:7] == [240, 67, 16, 62, 20, 2, 3]:
+        return {'type': 'meters'}
+    return {'type': 'unknown'}
+
+
+def run(number, parse=protocol.parse):
+    results = {}
+    for name, message in MESSAGES.items():
+        timer = timeit.Timer(lambda: parse(message))
+        best = min(timer.repeat(repeat=5, number=number))
+        results[name] = best / number * 1e9
+    return results
+
+
+def compare(number):
+    '''
+        {type: (legacy ns/message, protocol.parse ns/message)}
+    '''
+    results = {}
+    for name, message in MESSAGES.items():
+        assert protocol.parse(message).type == legacy_parse(message)['type'] == name
+        # alternate the two so drift of the machine hits both alike
+        timers = [timeit.Timer(lambda: legacy_parse(message)), timeit.Timer(lambda: protocol.parse(message))]
+        best = [float('inf'), float('inf')]
+        for _ in range(7):
+            for i, timer in enumerate(timers):
+                best[i] = min(best[i], timer.timeit(number))
+        results[name] = (best[0] / number * 1e9, best[1] / number * 1e9)
+    return results
+
+
+def run_log(path, repeat=5):
+    '''
+        Parse the incoming messages of a URxxx.recorder log as they came off the wire,
+        returns {type: (count, ns/message)}.
+    '''
+    with recorder.RecordLog(path) as log:
+        messages = [list(record.message) for record in log if record.direction == recorder.INCOMING]
+    types = [protocol.parse(message).type for message in messages]
+    best = Counter()
+    for i in range(repeat):
+        elapsed = Counter()
+        for message, type in zip(messages, types):
+            started = time.perf_counter_ns()
+            protocol.parse(message)
+            elapsed[type] += time.perf_counter_ns() - started
+        best = elapsed if not best else Counter({type: min(ns, best[type]) for type, ns in elapsed.items()})
+    counts = Counter(types)
+    return {type: (count, best[type] / count) for type, count in counts.most_common()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sysex parser microbenchmark')
+    parser.add_argument('--number', '-n', type=int, default=100000, help='Messages per measurement')
+    parser.add_argument('--log', action='store', metavar='FILE', help='Parse the incoming traffic of a recorded session instead')
+    parser.add_argument('--compare', action='store_true', help='Compare with the parser protocol.parse replaced')
+    args = parser.parse_args()
+
+    if args.log:
+        for name, (count, ns) in run_log(args.log).items():
+            print(f'{name:<20} {count:>8} {ns:>8.1f} ns/message')
+        return
+    if args.compare:
+        print(f'{"":<20} {"legacy":>8} {"parse":>8} ns/message')
+        for name, (legacy, current) in compare(args.number).items():
+            print(f'{name:<20} {legacy:>8.1f} {current:>8.1f}   x{legacy / current:.2f}')
+        return
+    for name, ns in run(args.number).items():
+        print(f'{name:<20} {ns:>8.1f} ns/message')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+'''
+    Cold start guard for the urcontrol CLI.
+
+    Runs metadata commands in fresh interpreters with -X importtime, reports the wall time
+    and the slowest imports, and fails if a command is slower than --max-ms or loads a module
+    it must not need (rtmidi, device code).
+
+        python3 -m benchmarks.bench_startup [--runs N] [--max-ms MS]
+'''
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+URCONTROL = os.path.join(ROOT, 'urcontrol.py')
+
+COMMANDS = [
+    ['--list-units'],
+    ['--list-parameters'],
+    ['--list-parameters', '--verbose', '--unit', 'chstrip'],
+]
+
+FORBIDDEN = ('rtmidi', 'URxxx.ur44c', 'URxxx.ur44c_bulk', 'utils')
+
+
+def parse_importtime(stderr):
+    # "import time: self [us] | cumulative | imported package"
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        imports.append((int(cumulative_us), int(self_us), name.strip()))
+    return imports
+
+
+def run(command, runs):
+    wall = []
+    imports = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable, '-X', 'importtime', URCONTROL] + command,
+                                cwd=ROOT, capture_output=True, text=True, check=True)
+        wall.append((time.perf_counter() - started) * 1000)
+        imports = parse_importtime(result.stderr)
+    return statistics.median(wall), imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description='urcontrol cold start benchmark')
+    parser.add_argument('--runs', '-n', type=int, default=10, help='Runs per command')
+    parser.add_argument('--max-ms', type=float, default=None, help='Fail if the median wall time is above this')
+    parser.add_argument('--top', type=int, default=5, help='Show the slowest imports')
+    args = parser.parse_args()
+
+    failed = False
+    for command in COMMANDS:
+        median_ms, imports = run(command, args.runs)
+        print(f'urcontrol {" ".join(command)}: {median_ms:.1f} ms (median of {args.runs})')
+        for cumulative_us, self_us, name in sorted(imports, reverse=True)[:args.top]:
+            print(f'    {cumulative_us/1000:>7.2f} ms  {name}')
+
+        loaded = [name for _, _, name in imports if name in FORBIDDEN]
+        if loaded:
+            print(f'    FAILED: loads {", ".join(loaded)}')
+            failed = True
+        if args.max_ms is not None and median_ms > args.max_ms:
+            print(f'    FAILED: slower than {args.max_ms} ms')
+            failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
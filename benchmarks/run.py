@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+
+'''
+    Benchmark suite for the protocol, parser and GUI hot paths, headless against the
+    emulated device (test/ur44c_emulator.py).
+
+        python3 -m benchmarks.run [--quick] [--only parser,roundtrip] [--output FILE]
+        python3 -m benchmarks.run --save-baseline      # store results as the new baseline
+        python3 -m benchmarks.run --check              # exit 1 on regressions
+
+    Results are JSON: {"meta": {...}, "results": {name: {"value", "unit", "better"}}}.
+    When a baseline exists every result is compared against it and changes worse than
+    --threshold are reported as regressions. Baselines depend on the machine, so none is
+    shipped: run --save-baseline once where --check runs; --check fails without one.
+'''
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import timeit
+
+from URxxx.meters import MeterBuffer
+from URxxx.snapshot import read_snapshot
+from URxxx.ur44c import UR44C
+from benchmarks import bench_parser
+from test.ur44c_emulator import UR44C_emulator
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+
+
+class NullOut():
+    def send_message(self, message):
+        pass
+
+
+def result(value, unit, better='lower'):
+    return {'value': value, 'unit': unit, 'better': better}
+
+
+def best_ns(function, number):
+    return min(timeit.Timer(function).repeat(repeat=5, number=number)) / number * 1e9
+
+
+def bench_parser_suite(args):
+    results = {}
+    for name, (legacy, ns) in bench_parser.compare(args.number).items():
+        results[f'parser.{name}'] = result(ns, 'ns')
+        results[f'parser.legacy.{name}'] = result(legacy, 'ns')
+
+    buffer = MeterBuffer()
+    message = bench_parser.MESSAGES['meters']
+    results['meters.push'] = result(best_ns(lambda: buffer.push(message, 0.0), args.number // 10), 'ns')
+    results['meters.last64'] = result(best_ns(lambda: buffer.last(64), args.number // 10), 'ns')
+    return results
+
+
+def bench_encode(args):
+    emulator = UR44C_emulator()
+    device = UR44C(emulator.midi_in, NullOut(), settle_time=0)
+    emulator.close()
+    return {
+        'encode.change': result(best_ns(lambda: device.MIDISendChangeParameterValue(12, 103, 2), args.number), 'ns'),
+        'encode.query': result(best_ns(lambda: device.MIDISendQueryParameterValue(12, 2), args.number), 'ns'),
+    }
+
+
+def open_emulated(args):
+    emulator = UR44C_emulator(latency=args.latency, jitter=args.jitter)
+    return emulator, UR44C(emulator.midi_in, emulator.midi_out, settle_time=0)
+
+
+def bench_roundtrip(args):
+    results = {}
+    emulator, device = open_emulated(args)
+    try:
+        latencies = []
+        for i in range(args.roundtrips):
+            started = time.perf_counter()
+            device.GetParameter(12, i % device.num_inputs)
+            latencies.append((time.perf_counter() - started) * 1000)
+        results['roundtrip.get.median'] = result(statistics.median(latencies), 'ms')
+        results['roundtrip.get.p95'] = result(sorted(latencies)[int(len(latencies) * 0.95)], 'ms')
+
+        latencies = []
+        for i in range(args.roundtrips):
+            started = time.perf_counter()
+            device.SetParameter(12, i % 128, i % device.num_inputs)
+            latencies.append((time.perf_counter() - started) * 1000)
+        results['roundtrip.set.median'] = result(statistics.median(latencies), 'ms')
+
+        # concurrency = number of requests in flight
+        keys = [(channel, param) for channel in range(device.num_inputs) for param in device.registry.by_id][:args.roundtrips * 4]
+        for window in (1, 4, 16, 64):
+            started = time.perf_counter()
+            device.QueryParameters(keys, window, use_cache=False)
+            elapsed = time.perf_counter() - started
+            results[f'throughput.get.window{window}'] = result(len(keys) / elapsed, 'ops/s', 'higher')
+
+            changes = {key: 1 for key in keys}
+            started = time.perf_counter()
+            device.WriteParameters(changes, window)
+            elapsed = time.perf_counter() - started
+            results[f'throughput.set.window{window}'] = result(len(keys) / elapsed, 'ops/s', 'higher')
+    finally:
+        emulator.close()
+    return results
+
+
+def bench_full_state(args):
+    emulator, device = open_emulated(args)
+    try:
+        times = []
+        for _ in range(3):
+            started = time.perf_counter()
+            values = read_snapshot(device)
+            times.append((time.perf_counter() - started) * 1000)
+        return {
+            'full_state.read': result(min(times), 'ms'),
+            'full_state.parameters': result(len(values), 'count', 'higher'),
+        }
+    finally:
+        emulator.close()
+
+
+def bench_gui(args):
+    try:
+        import PySide6
+    except ImportError:
+        return {}
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    import main
+    from PySide6.QtWidgets import QApplication
+
+    app = QApplication.instance() or QApplication([])
+    emulator, device = open_emulated(args)
+    try:
+        main.ur44c = device
+        main.writer = main.Writer(device)
+        main.meter_refresh = main.MeterRefresh(device.meters)
+
+        started = time.perf_counter()
+        window = main.MainWindow()
+        cold = (time.perf_counter() - started) * 1000
+        window.deleteLater()
+
+        started = time.perf_counter()
+        main.snapshot = device.GetParameters(main.MainWindow.parameters(device.num_inputs))
+        window = main.MainWindow()
+        prefetched = (time.perf_counter() - started) * 1000
+        main.snapshot.clear()
+        window.deleteLater()
+        main.meter_refresh.timer.stop()
+        main.writer.stop()
+        app.processEvents()
+    finally:
+        emulator.close()
+    return {
+        'gui.mainwindow.direct': result(cold, 'ms'),
+        'gui.mainwindow.prefetched': result(prefetched, 'ms'),
+    }
+
+
+SUITES = {
+    'parser': bench_parser_suite,
+    'encode': bench_encode,
+    'roundtrip': bench_roundtrip,
+    'full_state': bench_full_state,
+    'gui': bench_gui,
+}
+
+
+def compare(results, baseline, threshold):
+    '''
+        Returns [(name, change)] of the results that got worse than threshold, change is
+        relative to the baseline (0.25 = 25% worse).
+    '''
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None or not previous['value']:
+            continue
+        change = (current['value'] - previous['value']) / previous['value']
+        if current['better'] == 'higher':
+            change = -change
+        current['baseline'] = previous['value']
+        current['change'] = change
+        if change > threshold:
+            regressions.append((name, change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='UR44C benchmark suite')
+    parser.add_argument('--only', action='store', help=f'Comma separated suites ({",".join(SUITES)})')
+    parser.add_argument('--quick', action='store_true', help='Fewer iterations')
+    parser.add_argument('--latency', type=float, default=0.001, help='Emulated one way latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Emulated jitter in seconds')
+    parser.add_argument('--output', '-o', action='store', help='Write the JSON results to this file')
+    parser.add_argument('--baseline', action='store', default=BASELINE, help='Baseline JSON to compare with')
+    parser.add_argument('--save-baseline', action='store_true', help='Store the results as the baseline')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Relative change that counts as a regression')
+    parser.add_argument('--check', action='store_true', help='Exit with 1 if anything regressed, 2 without a baseline')
+    args = parser.parse_args()
+    args.number = 10000 if args.quick else 100000
+    args.roundtrips = 50 if args.quick else 200
+
+    if args.check and not args.save_baseline and not os.path.exists(args.baseline):
+        print(f'No baseline at {args.baseline}, run with --save-baseline first', file=sys.stderr)
+        sys.exit(2)
+
+    suites = args.only.split(',') if args.only else list(SUITES)
+    results = {}
+    for suite in suites:
+        results.update(SUITES[suite](args))
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'latency': args.latency,
+            'jitter': args.jitter,
+            'quick': args.quick,
+        },
+        'results': results,
+    }
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)['results'], args.threshold)
+
+    for name, r in results.items():
+        line = f'{name:<32} {r["value"]:>12.2f} {r["unit"]}'
+        if 'change' in r:
+            line += f'  ({r["change"]*100:+.1f}% vs baseline{", REGRESSION" if r["change"] > args.threshold else ""})'
+        print(line)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.check and regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
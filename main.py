@@ -2,7 +2,7 @@ from __future__ import annotations
 
 """PySide6 port of the widgets/layouts/dynamiclayouts example from Qt v5.x"""
 
-from PySide6.QtCore import Qt, QSize, Signal, Slot
+from PySide6.QtCore import Qt, QSize, QObject, QTimer, Signal, Slot
 from PySide6.QtWidgets import (QApplication, QMainWindow, QLayout, QGridLayout,
                                QMessageBox, QGroupBox, QSpinBox, QSlider, QPushButton,
                                QProgressBar, QDial, QDialogButtonBox, QWidget,
@@ -13,12 +13,20 @@ from PySide6.QtGui import QPalette, QColor
 
 import utils
 import argparse
+import time
 from URxxx.ur22c import *
 from URxxx.ur44c import *
 from URxxx.params import *
+from URxxx.scheduler import WriteScheduler
+from URxxx.heartbeat import Heartbeat
 from test.ur44c_mock import *
 
 ur44c = None
+writer = None
+meter_refresh = None
+link_monitor = None
+snapshot = {}
+timing = {}
 
 
 WHITE = QColor(255, 255, 255)
@@ -30,6 +38,100 @@ DARK = QColor(66, 66, 66)
 RED = QColor(255, 0, 0)
 HIGHLIGHT = QColor(142, 45, 197).lighter()
 
+METER_MIN = -600
+
+
+def read_parameter(category, parameter, channel_no):
+    # values prefetched at startup are used while building the window, other reads go to the device
+    val = snapshot.get((category, parameter, channel_no))
+    if val is None:
+        val = ur44c.GetParameterByName(category, parameter, channel_no)
+    return val
+
+
+def control_parameters(controls):
+    # what a controls() table reads, for the startup prefetch
+    return [(cls.category, parameter, channel_no) for cls, channel_no, parameter in controls.values()]
+
+
+def build_controls(controls):
+    return {role: cls(channel_no, parameter) for role, (cls, channel_no, parameter) in controls.items()}
+
+
+class Writer(QObject):
+    failed = Signal(str, int, int)
+
+    def __init__(self, device, rate=50):
+        super().__init__()
+        self.scheduler = WriteScheduler(device, rate, on_failure=self.report_failure)
+
+    def report_failure(self, unit, name, value, input):
+        # called from the writer thread, the signal is delivered queued to the GUI thread
+        self.failed.emit(name, input, value)
+
+    def set(self, unit, name, value, input=0):
+        self.scheduler.set(unit, name, value, input)
+
+    def stop(self):
+        self.scheduler.stop()
+
+
+class LinkMonitor(QObject):
+    changed = Signal(str, str)
+
+    def __init__(self, device, reopen):
+        super().__init__()
+        self.heartbeat = Heartbeat(device, reopen=reopen)
+        # called from the heartbeat/MIDI thread, the signal is delivered queued to the GUI thread
+        self.heartbeat.subscribe(self.changed.emit)
+        self.heartbeat.start()
+
+    def stop(self):
+        self.heartbeat.stop()
+
+
+class MeterRefresh(QObject):
+    '''
+        Repaints level meters from the latest frame on a fixed-rate timer, independent of
+        how often meter messages arrive.
+    '''
+    def __init__(self, buffer, fps=30):
+        super().__init__()
+        self.buffer = buffer
+        self.widgets = []
+        self.frames = 0
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(1000 // fps)
+
+    def add(self, widget):
+        self.widgets.append(widget)
+
+    @Slot()
+    def refresh(self):
+        if self.buffer.frames == self.frames:
+            return
+        self.frames = self.buffer.frames
+        current, peak, timestamp = self.buffer.latest()
+        for widget in self.widgets:
+            widget.setValue(max(METER_MIN, min(0, current[widget.meter_no])))
+
+
+class Meter(QProgressBar):
+    def __init__(self, meter_no):
+        super().__init__()
+
+        self.meter_no = meter_no
+
+        self.setOrientation(Qt.Vertical)
+        self.setRange(METER_MIN, 0)
+        self.setValue(METER_MIN)
+        self.setTextVisible(False)
+        self.setFixedWidth(8)
+
+        meter_refresh.add(self)
+
 
 class Send(QWidget):
     category = UR44C_Params_Mixer
@@ -38,20 +140,20 @@ class Send(QWidget):
 
     @Slot()
     def dial(self, pos):
-        if not ur44c.SetParameterByName(self.category, self.parameter, pos, self.channel_no):
-            exit(1)
+        writer.set(self.category, self.parameter, pos, self.channel_no)
 
         label = utils.slider2dB(pos)
 
         self.val_label.setText(label)
 
 
-    def __init__(self, channel_no):
+    def __init__(self, channel_no, parameter="InputReverbSend"):
         super().__init__()
 
         self.channel_no = channel_no
+        self.parameter = parameter
 
-        val = ur44c.GetParameterByName(self.category, self.parameter, self.channel_no)
+        val = read_parameter(self.category, self.parameter, self.channel_no)
         if val == None:
             exit(1)
 
@@ -84,8 +186,7 @@ class Pan(QWidget):
 
     @Slot()
     def dial(self, pos):
-        if not ur44c.SetParameterByName(self.category, self.parameter, pos, self.channel_no):
-            exit(1)
+        writer.set(self.category, self.parameter, pos, self.channel_no)
 
         self.label.setText(utils.pan2Label(pos))
 
@@ -95,7 +196,7 @@ class Pan(QWidget):
         self.channel_no = channel_no
         self.parameter = parameter
 
-        val = ur44c.GetParameterByName(self.category, self.parameter, self.channel_no)
+        val = read_parameter(self.category, self.parameter, self.channel_no)
         if val == None:
             exit(1)
 
@@ -124,8 +225,7 @@ class Fader(QWidget):
 
     @Slot()
     def slide(self, pos):
-        if not ur44c.SetParameterByName(self.category, self.parameter, pos, self.channel_no):
-            exit(1)
+        writer.set(self.category, self.parameter, pos, self.channel_no)
 
         label = utils.slider2dB(pos)
 
@@ -138,7 +238,7 @@ class Fader(QWidget):
         self.channel_no = channel_no
         self.parameter = parameter
 
-        val = ur44c.GetParameterByName(self.category, self.parameter, self.channel_no)
+        val = read_parameter(self.category, self.parameter, self.channel_no)
         if val == None:
             exit(1)
 
@@ -184,8 +284,7 @@ class Button(QPushButton):
     def click(self):
         self.toggle()
 
-        if not ur44c.SetParameterByName(self.category, self.parameter, self.state, self.channel_no):
-            exit(1)
+        writer.set(self.category, self.parameter, int(self.state), self.channel_no)
 
 
     def __init__(self, text, channel_no, parameter):
@@ -194,7 +293,7 @@ class Button(QPushButton):
         self.channel_no = channel_no
         self.parameter = parameter
 
-        val = ur44c.GetParameterByName(self.category, self.parameter, self.channel_no)
+        val = read_parameter(self.category, self.parameter, self.channel_no)
         if val < 0 or val > 1:
             exit(1)
 
@@ -232,8 +331,7 @@ class FxSelect(QComboBox):
 
     @Slot()
     def select(self):
-        if not ur44c.SetParameterByName(self.category, self.parameter, self.currentIndex(), self.channel_no):
-            exit(1)
+        writer.set(self.category, self.parameter, self.currentIndex(), self.channel_no)
 
 
     def __init__(self, channel_no, parameter):
@@ -243,7 +341,7 @@ class FxSelect(QComboBox):
         self.parameter = parameter
 
         self.addItems(["No Effect", "Ch.Strip", "Clean", "Crunch", "Lead", "Drive", "Pitch Fix"])
-        index = ur44c.GetParameterByName(self.category, self.parameter, self.channel_no)
+        index = read_parameter(self.category, self.parameter, self.channel_no)
         self.setCurrentIndex(index)
 
         self.currentIndexChanged.connect(self.select)
@@ -266,6 +364,22 @@ class Solo(Button):
 
 
 class Fx(QWidget):
+    @staticmethod
+    def controls(channel_no):
+        return {
+            'record': (FxRecord, channel_no, "InputFXRec"),
+            'fx1_enable': (FxEnable, channel_no, "InputFX1Enabled"),
+            'fx1_edit': (FxEdit, channel_no, "InputFX1Enabled"),
+            'fx1_select': (FxSelect, channel_no, "InputFX1Type"),
+            'fx2_enable': (FxEnable, channel_no, "InputFX2Enabled"),
+            'fx2_edit': (FxEdit, channel_no, "InputFX1Enabled"),
+            'fx2_select': (FxSelect, channel_no, "InputFX2Type"),
+        }
+
+    @classmethod
+    def parameters(cls, channel_no):
+        return control_parameters(cls.controls(channel_no))
+
     def __init__(self, channel_no):
         super().__init__()
 
@@ -275,13 +389,14 @@ class Fx(QWidget):
         fx1_layout = QHBoxLayout()
         fx2_layout = QHBoxLayout()
 
-        fx_record_button = FxRecord(channel_no, "InputFXRec")
-        fx1_enable_button = FxEnable(channel_no, "InputFX1Enabled")
-        fx1_edit_button = FxEdit(channel_no, "InputFX1Enabled")
-        fx1_select_dropdown = FxSelect(channel_no, "InputFX1Type")
-        fx2_enable_button = FxEnable(channel_no, "InputFX2Enabled")
-        fx2_edit_button = FxEdit(channel_no, "InputFX1Enabled")
-        fx2_select_dropdown = FxSelect(channel_no, "InputFX2Type")
+        controls = build_controls(self.controls(channel_no))
+        fx_record_button = controls['record']
+        fx1_enable_button = controls['fx1_enable']
+        fx1_edit_button = controls['fx1_edit']
+        fx1_select_dropdown = controls['fx1_select']
+        fx2_enable_button = controls['fx2_enable']
+        fx2_edit_button = controls['fx2_edit']
+        fx2_select_dropdown = controls['fx2_select']
 
         spacer = QSpacerItem(15, 15, QSizePolicy.Minimum, QSizePolicy.Expanding)
 
@@ -306,24 +421,45 @@ class Fx(QWidget):
 
 
 class Input(QWidget):
+    @staticmethod
+    def controls(channel_no):
+        return {
+            'send': (Send, channel_no, "InputReverbSend"),
+            'pan': (Pan, channel_no, "InputMix1Pan"),
+            'mute': (Mute, channel_no, "InputMix1Mute"),
+            'solo': (Solo, channel_no, "InputMix1Solo"),
+            'fader': (Fader, channel_no, "InputMix1Volume"),
+        }
+
+    @classmethod
+    def parameters(cls, channel_no):
+        return Fx.parameters(channel_no) + control_parameters(cls.controls(channel_no))
+
     def __init__(self, channel_no):
         super().__init__()
 
         vlayout = QVBoxLayout()
         hlayout = QHBoxLayout()
 
+        fx = Fx(channel_no)
+        controls = build_controls(self.controls(channel_no))
+
         name_label = QLabel(f"Input {channel_no+1}")
-        mbutton = Mute(channel_no, "InputMix1Mute")
-        sbutton = Solo(channel_no, "InputMix1Solo")
+        mbutton = controls['mute']
+        sbutton = controls['solo']
 
         hlayout.addWidget(mbutton)
         hlayout.addWidget(sbutton)
 
-        vlayout.addWidget(Fx(channel_no))
-        vlayout.addWidget(Send(channel_no))
-        vlayout.addWidget(Pan(channel_no))
+        fader_layout = QHBoxLayout()
+        fader_layout.addWidget(controls['fader'])
+        fader_layout.addWidget(Meter(channel_no))
+
+        vlayout.addWidget(fx)
+        vlayout.addWidget(controls['send'])
+        vlayout.addWidget(controls['pan'])
         vlayout.addLayout(hlayout)
-        vlayout.addWidget(Fader(channel_no, "InputMix1Volume"))
+        vlayout.addLayout(fader_layout)
         vlayout.addWidget(name_label)
         vlayout.setAlignment(name_label, Qt.AlignCenter)
 
@@ -331,6 +467,19 @@ class Input(QWidget):
 
 
 class DAWInput(QWidget):
+    @staticmethod
+    def controls():
+        return {
+            'mute': (Mute, 0, "DAWMix1Mute"),
+            'solo': (Solo, 0, "DAWMix1Solo"),
+            'pan': (Pan, 0, "DAWMix1Pan"),
+            'fader': (Fader, 0, "DAWMix1Volume"),
+        }
+
+    @classmethod
+    def parameters(cls):
+        return control_parameters(cls.controls())
+
     def __init__(self):
         super().__init__()
 
@@ -339,16 +488,17 @@ class DAWInput(QWidget):
 
         name_label = QLabel(f"DAW")
         spacer = QSpacerItem(50, 50, QSizePolicy.Minimum, QSizePolicy.Expanding)
-        mbutton = Mute(0, "DAWMix1Mute")
-        sbutton = Solo(0, "DAWMix1Solo")
+        controls = build_controls(self.controls())
+        mbutton = controls['mute']
+        sbutton = controls['solo']
 
         hlayout.addWidget(mbutton)
         hlayout.addWidget(sbutton)
 
         vlayout.addItem(spacer)
-        vlayout.addWidget(Pan(0, "DAWMix1Pan"))
+        vlayout.addWidget(controls['pan'])
         vlayout.addLayout(hlayout)
-        vlayout.addWidget(Fader(0, "DAWMix1Volume"))
+        vlayout.addWidget(controls['fader'])
         vlayout.addWidget(name_label)
         vlayout.setAlignment(name_label, Qt.AlignCenter)
 
@@ -356,6 +506,19 @@ class DAWInput(QWidget):
 
 
 class MusicInput(QWidget):
+    @staticmethod
+    def controls():
+        return {
+            'mute': (Mute, 0, "MusicMix1Mute"),
+            'solo': (Solo, 0, "MusicMix1Solo"),
+            'pan': (Pan, 0, "InputMix1Pan"),
+            'fader': (Fader, 0, "MusicMix1Volume"),
+        }
+
+    @classmethod
+    def parameters(cls):
+        return control_parameters(cls.controls())
+
     def __init__(self):
         super().__init__()
 
@@ -364,16 +527,17 @@ class MusicInput(QWidget):
 
         spacer = QSpacerItem(50, 50, QSizePolicy.Minimum, QSizePolicy.Expanding)
         name_label = QLabel(f"Music")
-        mbutton = Mute(0, "MusicMix1Mute")
-        sbutton = Solo(0, "MusicMix1Solo")
+        controls = build_controls(self.controls())
+        mbutton = controls['mute']
+        sbutton = controls['solo']
 
         hlayout.addWidget(mbutton)
         hlayout.addWidget(sbutton)
 
         vlayout.addItem(spacer)
-        vlayout.addWidget(Pan(0))
+        vlayout.addWidget(controls['pan'])
         vlayout.addLayout(hlayout)
-        vlayout.addWidget(Fader(0, "MusicMix1Volume"))
+        vlayout.addWidget(controls['fader'])
         vlayout.addWidget(name_label)
         vlayout.setAlignment(name_label, Qt.AlignCenter)
 
@@ -381,6 +545,19 @@ class MusicInput(QWidget):
 
 
 class VoiceInput(QWidget):
+    @staticmethod
+    def controls():
+        return {
+            'mute': (Mute, 1, "MusicMix1Mute"),
+            'solo': (Solo, 1, "MusicMix1Solo"),
+            'pan': (Pan, 0, "InputMix1Pan"),
+            'fader': (Fader, 1, "MusicMix1Volume"),
+        }
+
+    @classmethod
+    def parameters(cls):
+        return control_parameters(cls.controls())
+
     def __init__(self):
         super().__init__()
 
@@ -389,16 +566,17 @@ class VoiceInput(QWidget):
 
         name_label = QLabel(f"Voice")
         spacer = QSpacerItem(50, 50, QSizePolicy.Minimum, QSizePolicy.Expanding)
-        mbutton = Mute(1, "MusicMix1Mute")
-        sbutton = Solo(1, "MusicMix1Solo")
+        controls = build_controls(self.controls())
+        mbutton = controls['mute']
+        sbutton = controls['solo']
 
         hlayout.addWidget(mbutton)
         hlayout.addWidget(sbutton)
 
         vlayout.addItem(spacer)
-        vlayout.addWidget(Pan(0))
+        vlayout.addWidget(controls['pan'])
         vlayout.addLayout(hlayout)
-        vlayout.addWidget(Fader(1, "MusicMix1Volume"))
+        vlayout.addWidget(controls['fader'])
         vlayout.addWidget(name_label)
         vlayout.setAlignment(name_label, Qt.AlignCenter)
 
@@ -406,6 +584,13 @@ class VoiceInput(QWidget):
 
 
 class MainWindow(QMainWindow):
+    @staticmethod
+    def parameters(num_inputs):
+        params = []
+        for i in range(0, num_inputs):
+            params += Input.parameters(i)
+        return params + DAWInput.parameters() + MusicInput.parameters() + VoiceInput.parameters()
+
     def __init__(self):
         super().__init__()
 
@@ -422,6 +607,32 @@ class MainWindow(QMainWindow):
 
         self.setWindowTitle("URcontrol")
 
+        writer.failed.connect(self.write_failed)
+        if link_monitor is not None:
+            link_monitor.changed.connect(self.link_changed)
+
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if 'first_paint' not in timing:
+            timing['first_paint'] = time.perf_counter()
+            print(f"Startup: prefetch {(timing['prefetched'] - timing['start'])*1000:.1f} ms "
+                  f"({timing['parameters']} parameters), "
+                  f"first paint {(timing['first_paint'] - timing['start'])*1000:.1f} ms")
+
+
+    @Slot(str, int, int)
+    def write_failed(self, parameter, channel_no, value):
+        self.statusBar().showMessage(f"Failed to set {parameter} (input {channel_no+1}) to {value}", 5000)
+
+
+    @Slot(str, str)
+    def link_changed(self, old, new):
+        if new == 'up':
+            self.statusBar().showMessage("Connection restored", 5000)
+        else:
+            self.statusBar().showMessage(f"Connection {new}, waiting for the device")
+
 
 def enable_dark_mode(app):
     dark_palette = QPalette()
@@ -473,6 +684,25 @@ if __name__ == '__main__':
     app = QApplication()
     enable_dark_mode(app)
 
+    writer = Writer(ur44c)
+    app.aboutToQuit.connect(writer.stop)
+
+    if not args.test:
+        link_monitor = LinkMonitor(ur44c, lambda: utils.find_midi_ports(args.midi_in, args.midi_out)[:2])
+        app.aboutToQuit.connect(link_monitor.stop)
+
+    meter_refresh = MeterRefresh(ur44c.meters)
+    ur44c.SubscribeMeters()
+    app.aboutToQuit.connect(ur44c.UnsubscribeMeters)
+
+    # read everything the layout needs in one pipelined batch before building widgets
+    timing['start'] = time.perf_counter()
+    parameters = MainWindow.parameters(ur44c.num_inputs)
+    snapshot = ur44c.GetParameters(parameters)
+    timing['prefetched'] = time.perf_counter()
+    timing['parameters'] = len(parameters)
+
     main_window = MainWindow()
+    snapshot.clear()
     main_window.show()
     app.exec()
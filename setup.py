@@ -28,4 +28,8 @@ setup(
     install_requires=[
         'python-rtmidi>=1.5.8'
     ],
+    extras_require={
+        # MeterBuffer.as_numpy()
+        'numpy': ['numpy'],
+    },
 )
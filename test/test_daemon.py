@@ -0,0 +1,55 @@
+import os
+import socket
+import tempfile
+import threading
+import unittest
+
+from URxxx.daemon import Daemon, DaemonClient
+from URxxx.ur44c import UR44C
+from test.ur44c_emulator import UR44C_emulator
+
+
+class DaemonTest(unittest.TestCase):
+    '''
+        DaemonClient -> Unix socket -> Daemon -> UR44C -> emulated device.
+    '''
+
+    def setUp(self):
+        self.emulator = UR44C_emulator(latency=0.001)
+        self.device = UR44C(self.emulator.midi_in, self.emulator.midi_out, settle_time=0)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'urcontrol.sock')
+        self.daemon = Daemon(self.device, self.path)
+        threading.Thread(target=self.daemon.serve_forever, daemon=True).start()
+        self.client = DaemonClient(self.path, timeout=5)
+
+    def tearDown(self):
+        self.client.close()
+        self.daemon.close()
+        self.emulator.close()
+        self.tmp.cleanup()
+
+    def test_get_and_set(self):
+        self.assertEqual(self.client.GetParameterByName('mixer', 'InputMix1Volume', 1), 103)
+        self.assertTrue(self.client.SetParameterByName('mixer', 'InputMix1Volume', 90, 1))
+        self.assertEqual(self.emulator.state[(1, 12)], 90)
+        self.assertEqual(self.client.GetParameterByName('mixer', 'InputMix1Volume', 1), 90)
+
+    def test_non_ascii_request_gets_an_error_reply(self):
+        with self.assertRaisesRegex(ValueError, 'Lautstärke'):
+            self.client.GetParameterByName('mixer', 'Lautstärke')
+        self.assertEqual(self.client.request('ping'), 'OK')
+
+    def test_undecodable_request_keeps_the_connection(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(5)
+        sock.connect(self.path)
+        with sock, sock.makefile('rwb') as f:
+            f.write(b'get mixer \xff\xfe 1\nping\n')
+            f.flush()
+            self.assertTrue(f.readline().startswith(b'ERROR'))
+            self.assertEqual(f.readline(), b'OK\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
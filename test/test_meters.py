@@ -0,0 +1,46 @@
+import random
+import unittest
+
+from URxxx import protocol
+from URxxx.meters import MeterBuffer
+
+
+def frame(values):
+    # values: (current high, current low, peak high, peak low) per meter
+    return [0xF0, 0x43, 0x10, 0x3E, 0x14, 0x02, 0x03] + [b for value in values for b in value] + [0xF7]
+
+
+def decode(high, low):
+    return (high - 128 if high > 64 else high) * 128 + low
+
+
+class MeterBufferTest(unittest.TestCase):
+
+    def test_push_decodes_every_value(self):
+        rng = random.Random(7)
+        buffer = MeterBuffer(capacity=4)
+        for i in range(10):
+            values = [[rng.randrange(128) for _ in range(4)] for _ in range(protocol.METER_COUNT)]
+            # every high byte value shows up, including the sign boundary at 64/65
+            for meter, high in enumerate((0, 1, 63, 64, 65, 66, 126, 127)):
+                values[meter][0] = values[meter][2] = high
+            message = frame(values)
+            buffer.push(message if i % 2 else bytes(message), float(i))
+
+            current, peak, timestamp = buffer.latest()
+            self.assertEqual(list(current), [decode(v[0], v[1]) for v in values])
+            self.assertEqual(list(peak), [decode(v[2], v[3]) for v in values])
+            self.assertEqual(timestamp, float(i))
+
+    def test_last_and_peak_hold(self):
+        buffer = MeterBuffer(capacity=4)
+        for level in range(6):
+            buffer.push(frame([(0, level, 0, 10 - level)] * protocol.METER_COUNT), float(level))
+        current, peak, timestamps = buffer.last(4)
+        self.assertEqual(list(timestamps), [2.0, 3.0, 4.0, 5.0])
+        self.assertEqual(list(current[::protocol.METER_COUNT]), [2, 3, 4, 5])
+        self.assertEqual(list(buffer.peak_hold(4)), [8] * protocol.METER_COUNT)
+
+
+if __name__ == '__main__':
+    unittest.main()
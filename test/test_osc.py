@@ -0,0 +1,95 @@
+import time
+import unittest
+
+from URxxx.osc import BUNDLE_TAG, IMMEDIATELY, OSCBridge, OSCClient, encode_bundle, encode_message
+from URxxx.ur44c import UR44C
+from test.ur44c_emulator import UR44C_emulator
+
+
+class OSCLoopbackTest(unittest.TestCase):
+    '''
+        OSC client -> UDP loopback -> OSCBridge -> UR44C -> emulated device, and back.
+    '''
+
+    def setUp(self):
+        self.emulator = UR44C_emulator(latency=0.002)
+        self.device = UR44C(self.emulator.midi_in, self.emulator.midi_out, settle_time=0)
+        self.bridge = OSCBridge(self.device, ('127.0.0.1', 0), query_timeout=0.5)
+        self.bridge.start()
+        self.client = OSCClient(self.bridge.address)
+
+    def tearDown(self):
+        self.client.close()
+        self.bridge.close()
+        self.emulator.close()
+
+    def receive(self, address, timeout=2):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            for message in self.client.receive():
+                if message[0] == address:
+                    return message[1]
+        self.fail(f'no {address} received')
+
+    def test_get(self):
+        self.client.send('/ur/mixer/InputMix1Volume/1')
+        self.assertEqual(self.receive('/ur/mixer/InputMix1Volume/1'), [103])
+
+    def test_set_then_get(self):
+        self.client.send('/ur/mixer/InputMix1Volume/2', 90)
+        deadline = time.monotonic() + 2
+        while self.emulator.state[(1, 12)] != 90 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.emulator.state[(1, 12)], 90)
+        self.client.send('/ur/mixer/InputMix1Volume/2')
+        self.assertEqual(self.receive('/ur/mixer/InputMix1Volume/2'), [90])
+
+    def test_errors(self):
+        self.client.send('/ur/mixer/NoSuchParameter/1')
+        self.assertIn('unknown parameter', self.receive('/ur/error')[0])
+        self.client.send('/ur/mixer/InputMix1Volume/1', 1000)
+        self.assertIn('out of range', self.receive('/ur/error')[0])
+
+    def test_malformed_packets_do_not_stop_the_bridge(self):
+        get = encode_message('/ur/mixer/InputMix1Volume/1')
+        for packet in (BUNDLE_TAG + IMMEDIATELY + b'\0\0',                      # truncated element size
+                       BUNDLE_TAG + IMMEDIATELY + b'\0\0\1\0' + get,          # size past the end
+                       BUNDLE_TAG + IMMEDIATELY + b'\xff\xff\xff\xfc' + get,  # negative size
+                       encode_bundle([get])[:-2]):                            # truncated element
+            self.client.sock.sendto(packet, self.bridge.address)
+            self.assertIn('Malformed', self.receive('/ur/error')[0])
+        self.client.send('/ur/mixer/InputMix1Volume/1')
+        self.assertEqual(self.receive('/ur/mixer/InputMix1Volume/1'), [103])
+
+    def test_non_finite_values_are_rejected(self):
+        for value in (float('inf'), float('-inf'), float('nan')):
+            self.client.send('/ur/mixer/InputMix1Volume/1', value)
+            self.assertIn('finite', self.receive('/ur/error')[0])
+        self.client.send('/ur/subscribe', float('nan'))
+        self.assertIn('rate', self.receive('/ur/error')[0])
+        self.client.send('/ur/mixer/InputMix1Volume/1')
+        self.assertEqual(self.receive('/ur/mixer/InputMix1Volume/1'), [103])
+
+    def test_subscribe_pushes_device_changes(self):
+        self.client.send('/ur/subscribe')
+        time.sleep(0.05)
+        self.emulator.turn(0, 12, 77)
+        self.assertEqual(self.receive('/ur/mixer/InputMix1Volume/1'), [77])
+
+    def test_silent_device_does_not_block_other_gets(self):
+        # the device stops answering queries, a get for a cached value still comes back
+        # right away while the other one waits for its reply
+        self.client.send('/ur/mixer/InputMix1Pan/1')
+        self.assertEqual(self.receive('/ur/mixer/InputMix1Pan/1'), [0])
+        self.emulator.drop_rate = 1.0
+
+        self.client.send('/ur/mixer/InputMix1Volume/1')
+        started = time.monotonic()
+        self.client.send('/ur/mixer/InputMix1Pan/1')
+        self.assertEqual(self.receive('/ur/mixer/InputMix1Pan/1'), [0])
+        self.assertLess(time.monotonic() - started, 0.25)
+        self.assertIn('did not answer', self.receive('/ur/error')[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import io
+import struct
+import unittest
+
+from URxxx import pcap
+from URxxx.recorder import INCOMING, OUTGOING
+from test.ur44c_emulator import meter_message, reply_message
+
+QUERY = bytes([0xF0, 0x43, 0x30, 0x3E, 0x14, 0x01, 0x04, 0x02, 0x00, 0x00, 0x0C, 0x00, 0x00, 0x01, 0xF7])
+REPLY = bytes(reply_message(1, 12, 103))
+METERS = bytes(meter_message([-1270] * 47, [-300] * 47))
+
+MIDI_IN = 0x82
+MIDI_OUT = 0x02
+
+
+def usb_midi(sysex, cable=0):
+    # USB-MIDI event packets: CIN 4 for every 3 bytes but the last ones, CIN 5-7 for those
+    packets = b''
+    for offset in range(0, len(sysex), 3):
+        chunk = sysex[offset:offset+3]
+        cin = 0x4 if offset + 3 < len(sysex) else 0x4 + len(chunk)
+        packets += bytes([cable << 4 | cin]) + chunk + b'\0' * (3 - len(chunk))
+    return packets
+
+
+def usbmon(event, epnum, data, bus=1, device=5, status=0):
+    return struct.pack('<QBBBBHbbqiiII8s', 1, ord(event), 3, epnum, device, bus, 0, 0,
+                       0, 0, status, len(data), len(data), bytes(8)) + data
+
+
+def transfers():
+    # a query, the reply split over two transfers with the meter frame starting in the
+    # second one and ending in a third, padded to the USB packet size
+    reply, meters = usb_midi(REPLY), usb_midi(METERS)
+    return [
+        usbmon('S', MIDI_OUT, usb_midi(QUERY)),
+        usbmon('C', MIDI_OUT, b''),
+        usbmon('C', MIDI_IN, reply[:12]),
+        usbmon('C', MIDI_IN, reply[12:] + meters[:100]),
+        usbmon('C', MIDI_IN, meters[100:] + bytes(8)),
+    ]
+
+
+def pcap_file(packets, nanoseconds=False, order='<'):
+    magic = 0xA1B23C4D if nanoseconds else 0xA1B2C3D4
+    data = struct.pack(order + 'IHHiIII', magic, 2, 4, 0, 0, 65535, pcap.LINKTYPE_USB_LINUX)
+    for i, packet in enumerate(packets):
+        fraction = 500000000 if nanoseconds else 500000
+        data += struct.pack(order + 'IIII', 10 + i, fraction, len(packet), len(packet)) + packet
+    return data
+
+
+def block(block_type, body, order='<'):
+    body += b'\0' * (-len(body) % 4)
+    return struct.pack(order + 'II', block_type, len(body) + 12) + body + struct.pack(order + 'I', len(body) + 12)
+
+
+def pcapng_file(packets, tsresol=None, order='<'):
+    data = block(0x0A0D0D0A, struct.pack(order + 'IHHq', 0x1A2B3C4D, 1, 0, -1), order)
+    options = b''
+    if tsresol is not None:
+        options = struct.pack(order + 'HHB3x', 9, 1, tsresol) + struct.pack(order + 'HH', 0, 0)
+    data += block(1, struct.pack(order + 'HHI', pcap.LINKTYPE_USB_LINUX, 0, 65535) + options, order)
+    # a block type the reader doesn't know must be skipped
+    data += block(0x00000BAD, b'custom block body', order)
+    units = 10 ** (tsresol or 6)
+    for i, packet in enumerate(packets):
+        timestamp = (10 + i) * units + units // 2
+        data += block(6, struct.pack(order + 'IIIII', 0, timestamp >> 32, timestamp & 0xFFFFFFFF,
+                                     len(packet), len(packet)) + packet, order)
+    return data
+
+
+class PcapTest(unittest.TestCase):
+
+    def check_messages(self, data):
+        messages = list(pcap.read_messages(io.BytesIO(data)))
+        self.assertEqual([(m.direction, m.endpoint, m.data) for m in messages],
+                         [(OUTGOING, 2, QUERY), (INCOMING, 2, REPLY), (INCOMING, 2, METERS)])
+        self.assertEqual([m.parsed.type for m in messages], ['query-parameter', 'reply-parameter', 'meters'])
+        self.assertEqual(messages[1].parsed.value, 103)
+        # each message carries the time of the transfer that completed it
+        self.assertEqual([m.time for m in messages], [10.5, 13.5, 14.5])
+
+    def test_pcap_microseconds(self):
+        self.check_messages(pcap_file(transfers()))
+
+    def test_pcap_nanoseconds(self):
+        self.check_messages(pcap_file(transfers(), nanoseconds=True))
+
+    def test_pcap_big_endian(self):
+        self.check_messages(pcap_file(transfers(), order='>'))
+
+    def test_pcapng_default_resolution(self):
+        self.check_messages(pcapng_file(transfers()))
+
+    def test_pcapng_nanoseconds(self):
+        self.check_messages(pcapng_file(transfers(), tsresol=9))
+
+    def test_pcapng_big_endian(self):
+        self.check_messages(pcapng_file(transfers(), tsresol=9, order='>'))
+
+    def test_truncated_captures_end_at_the_last_whole_packet(self):
+        for data in (pcap_file(transfers()), pcapng_file(transfers())):
+            whole = list(pcap.read_packets(io.BytesIO(data)))
+            self.assertEqual(len(whole), 5)
+            for cut in (len(data) - 1, len(data) - 60, len(data) - len(transfers()[-1]) - 20):
+                packets = list(pcap.read_packets(io.BytesIO(data[:cut])))
+                self.assertLess(len(packets), 5)
+                self.assertEqual(packets, whole[:len(packets)])
+
+    def test_malformed_captures(self):
+        header = pcapng_file([])
+        for data in (b'URSN\x01UR44C\0\0\0',
+                     header + struct.pack('<II', 6, 8),                          # block shorter than its framing
+                     header + block(6, struct.pack('<III', 0, 0, 0)),            # packet block without its fields
+                     header + block(6, struct.pack('<IIIII', 1, 0, 0, 0, 0))):   # interface never described
+            with self.assertRaises(ValueError):
+                list(pcap.read_packets(io.BytesIO(data)))
+
+    def test_lost_sysex_end(self):
+        # the rest of the meter frame never arrives, the next message starts over
+        data = pcap_file([usbmon('C', MIDI_IN, usb_midi(METERS)[:40]), usbmon('C', MIDI_IN, usb_midi(REPLY))])
+        self.assertEqual([m.data for m in pcap.read_messages(io.BytesIO(data))], [REPLY])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+
+from URxxx import protocol
+from URxxx.recorder import OUTGOING, RecordLog
+from URxxx.ur44c import UR44C
+from test.ur44c_emulator import UR44C_emulator
+
+
+class RecorderTest(unittest.TestCase):
+    '''
+        Traffic of a UR44C talking to the emulated device, recorded and read back.
+    '''
+
+    def setUp(self):
+        self.emulator = UR44C_emulator(latency=0)
+        self.device = UR44C(self.emulator.midi_in, self.emulator.midi_out, settle_time=0)
+        fd, self.path = tempfile.mkstemp(suffix='.urrec')
+        os.close(fd)
+
+    def tearDown(self):
+        self.device.StopRecording()
+        self.emulator.close()
+        os.unlink(self.path)
+
+    def test_outgoing_is_recorded_before_it_is_sent(self):
+        recorder = self.device.StartRecording(self.path)
+        send_message = self.emulator.midi_out.send_message
+        counts = []
+
+        def send(message):
+            counts.append(recorder.count)
+            send_message(message)
+
+        self.emulator.midi_out.send_message = send
+        self.assertTrue(self.device.SetParameter(12, 90, 1))
+        self.assertEqual(self.device.GetParameter(12, 1), 90)
+        self.device.StopRecording()
+        # every message was already in the log when it went to the port
+        self.assertEqual(len(counts), 3)
+        self.assertTrue(all(count > 0 for count in counts))
+
+        with RecordLog(self.path) as log:
+            records = [(record.direction, protocol.parse(record.message)) for record in log]
+        # each message from the device comes after the one it answers
+        answers = {'change-parameter': 'change-parameter', 'reply-parameter': 'query-parameter'}
+        sent = []
+        for direction, message in records:
+            if direction == OUTGOING:
+                sent.append(message.type)
+            else:
+                sent.remove(answers[message.type])
+        self.assertEqual(sent, [])
+        self.assertEqual(len(records), 6)
+        self.assertEqual(records[-1][1], protocol.ReplyParameter(1, 12, 90))
+
+
+if __name__ == '__main__':
+    unittest.main()
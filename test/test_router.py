@@ -0,0 +1,121 @@
+import threading
+import unittest
+
+from URxxx.scheduler import WriteScheduler
+from URxxx.ur44c import UR44C
+from test.ur44c_emulator import UR44C_emulator
+
+# InputMix1Volume
+VOLUME = 12
+
+
+class RequestRouterTest(unittest.TestCase):
+    '''
+        RequestRouter of a UR44C talking to the emulated device.
+    '''
+
+    def setUp(self):
+        self.emulator = UR44C_emulator(latency=0.002, jitter=0.002, seed=1)
+        self.device = UR44C(self.emulator.midi_in, self.emulator.midi_out, settle_time=0)
+        self.router = self.device.router
+
+    def tearDown(self):
+        self.emulator.close()
+
+    def test_replies_complete_requests_in_wire_order(self):
+        first = self.router.request(0, VOLUME)
+        self.emulator.state[(0, VOLUME)] = 50
+        second = self.router.request(0, VOLUME, force=True)
+        joined = self.router.request(0, VOLUME)
+        self.assertIs(joined, second)
+        self.assertEqual(self.router.wait(first, 2), 103)
+        self.assertEqual(self.router.wait(second, 2), 50)
+        self.router.release(joined)
+        self.assertEqual(self.router.in_flight(), 0)
+
+    def test_concurrent_gets(self):
+        for channel in range(self.device.num_inputs):
+            self.emulator.state[(channel, VOLUME)] = 10 + channel
+        results = {}
+
+        def worker(n):
+            for i in range(20):
+                channel = (n + i) % self.device.num_inputs
+                results[(n, i)] = (channel, self.router.get(channel, VOLUME, timeout=2, force=i % 3 == 0))
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(results), 160)
+        for channel, value in results.values():
+            self.assertEqual(value, 10 + channel)
+        self.assertEqual(self.router.in_flight(), 0)
+
+    def test_lost_reply_times_out_without_shifting_later_replies(self):
+        self.emulator.drop_rate = 1.0
+        self.assertIsNone(self.router.get(0, VOLUME, timeout=0.05))
+        self.assertEqual(self.router.in_flight(), 0)
+        self.emulator.drop_rate = 0.0
+        self.emulator.state[(0, VOLUME)] = 60
+        self.assertEqual(self.router.get(0, VOLUME, timeout=2), 60)
+
+    def test_failed_send_leaves_nothing_queued(self):
+        send_message = self.emulator.midi_out.send_message
+
+        def broken(message):
+            raise OSError('port closed')
+
+        self.emulator.midi_out.send_message = broken
+        with self.assertRaises(OSError):
+            self.router.request(0, VOLUME)
+        self.assertEqual(self.router.in_flight(), 0)
+
+        self.emulator.midi_out.send_message = send_message
+        self.assertEqual(self.router.get(0, VOLUME, timeout=2), 103)
+        self.assertEqual(self.router.in_flight(), 0)
+
+    def test_offline_fails_without_sending(self):
+        self.router.offline = True
+        self.assertIsNone(self.router.get(0, VOLUME, timeout=2))
+        self.assertEqual(self.emulator.stats['queries'], 0)
+
+
+class WriteSchedulerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.emulator = UR44C_emulator(latency=0.002)
+        self.device = UR44C(self.emulator.midi_in, self.emulator.midi_out, settle_time=0)
+
+    def tearDown(self):
+        self.emulator.close()
+
+    def test_writes_to_one_parameter_coalesce(self):
+        scheduler = WriteScheduler(self.device, rate=10)
+        try:
+            writes = [scheduler.set('mixer', 'InputMix1Volume', value, 1) for value in range(100)]
+            writes.append(scheduler.set('mixer', 'InputMix1Volume', 7, 2))
+            self.assertTrue(scheduler.flush(5))
+        finally:
+            scheduler.stop()
+        self.assertTrue(all(write.wait(0) for write in writes))
+        self.assertEqual(self.emulator.state[(1, VOLUME)], 99)
+        self.assertEqual(self.emulator.state[(2, VOLUME)], 7)
+        # the first value may go out before the rest arrive, everything after it is one write
+        self.assertLessEqual(self.emulator.stats['changes'], 3)
+
+    def test_failed_write_is_reported(self):
+        failures = []
+        scheduler = WriteScheduler(self.device, on_failure=lambda *write: failures.append(write))
+        self.emulator.drop_rate = 1.0
+        try:
+            write = scheduler.set('mixer', 'InputMix1Volume', 90, 1)
+            self.assertFalse(write.wait(10))
+        finally:
+            scheduler.stop()
+        self.assertEqual(failures, [('mixer', 'InputMix1Volume', 90, 1)])
+
+
+if __name__ == '__main__':
+    unittest.main()
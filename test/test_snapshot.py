@@ -0,0 +1,82 @@
+import os
+import struct
+import tempfile
+import unittest
+
+from URxxx import snapshot
+from URxxx.ur44c import UR44C
+from test.ur44c_emulator import UR44C_emulator
+
+# LineInputLevel, only valid on ch3
+CH3_ONLY = 41
+
+
+class SnapshotRoundTripTest(unittest.TestCase):
+    '''
+        read_snapshot -> save_snapshot -> load_snapshot -> restore_snapshot against emulated devices.
+    '''
+
+    def setUp(self):
+        self.source = UR44C_emulator(latency=0.001)
+        self.target = UR44C_emulator(latency=0.001)
+        self.devices = [UR44C(emulator.midi_in, emulator.midi_out, settle_time=0) for emulator in (self.source, self.target)]
+        fd, self.path = tempfile.mkstemp(suffix='.ursn')
+        os.close(fd)
+
+    def tearDown(self):
+        os.unlink(self.path)
+        self.source.close()
+        self.target.close()
+
+    def test_round_trip(self):
+        device, restored = self.devices
+        registry = device.registry
+        index = registry.by_id[CH3_ONLY][0]
+        changed = {(1, 12): 90, (4, 12): -5, (3, CH3_ONLY): registry.mins[index]}
+        for (channel, param), value in changed.items():
+            self.source.state[(channel, param)] = value
+
+        keys = snapshot.snapshot_keys(device)
+        self.assertEqual([channel for channel, param in keys if param == CH3_ONLY], [3])
+
+        values = snapshot.read_snapshot(device)
+        self.assertEqual(sorted(values), keys)
+        self.assertEqual(values, {key: self.source.state[key] for key in keys})
+        # parameters are only queried on the channels they are valid on
+        self.assertEqual(self.source.stats['queries'], len(keys))
+
+        snapshot.save_snapshot(self.path, device.model, values)
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        self.assertEqual(data[:13], b'URSN\x01UR44C\0\0\0')
+        self.assertEqual(struct.unpack_from('<I', data, 13)[0], len(values))
+        self.assertEqual(len(data), 17 + 7*len(values))
+        self.assertEqual(struct.unpack_from('<BHi', data, 17 + 7*keys.index((3, CH3_ONLY))), (3, CH3_ONLY, registry.mins[index]))
+
+        model, loaded = snapshot.load_snapshot(self.path)
+        self.assertEqual(model, 'UR44C')
+        self.assertEqual(loaded, values)
+
+        report = snapshot.restore_snapshot(restored, loaded)
+        self.assertEqual(report['failed'], [])
+        self.assertEqual(sorted(report['changed']), sorted(changed))
+        self.assertEqual(len(report['unchanged']), len(loaded) - len(changed))
+        self.assertEqual({key: self.target.state[key] for key in keys}, values)
+
+        report = snapshot.restore_snapshot(restored, loaded)
+        self.assertEqual(report['changed'], [])
+        self.assertEqual(len(report['unchanged']), len(loaded))
+
+    def test_load_rejects_other_files(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'RIFF\x01UR44C\0\0\0\0\0\0\0')
+        with self.assertRaisesRegex(ValueError, 'not a snapshot'):
+            snapshot.load_snapshot(self.path)
+        with open(self.path, 'wb') as f:
+            f.write(b'URSN\x02UR44C\0\0\0\0\0\0\0')
+        with self.assertRaisesRegex(ValueError, 'version 2'):
+            snapshot.load_snapshot(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,283 @@
+import heapq
+import random
+import threading
+import time
+
+from URxxx import protocol
+from URxxx.registry import get_registry
+
+
+def _value_bytes(value):
+    v32 = value & 0xFFFFFFFF
+    return [(v32 >> 28) & 0x7F, (v32 >> 21) & 0x7F, (v32 >> 14) & 0x7F, (v32 >> 7) & 0x7F, v32 & 0x7F]
+
+
+def reply_message(channel, param, value):
+    return [0xF0, 0x43, 0x10, 0x3E, 0x14, 0x01, 0x04, 0x02, 0x00, (param >> 7) & 0x7F, param & 0x7F, 0x00, 0x00, channel] + _value_bytes(value) + [0xF7]
+
+
+def change_message(channel, param, value):
+    return [0xF0, 0x43, 0x10, 0x3E, 0x14, 0x01, 0x01, 0x00, (param >> 7) & 0x7F, param & 0x7F, 0x00, 0x00, channel] + _value_bytes(value) + [0xF7]
+
+
+def meter_message(current, peak):
+    message = [0xF0, 0x43, 0x10, 0x3E, 0x14, 0x02, 0x03]
+    for c, p in zip(current, peak):
+        # two 7-bit bytes per value, the high one is signed
+        message += [(c >> 7) & 0x7F, c & 0x7F, (p >> 7) & 0x7F, p & 0x7F]
+    return message + [0xF7]
+
+
+KEEPALIVE_MESSAGE = [0xF0, 0x43, 0x10, 0x3E, 0x14, 0x00, 0x04, 0x02, 0xF7]
+
+
+class EmulatedMidiIn():
+    '''
+        Stands in for rtmidi.MidiIn, messages from the emulator arrive on its delivery thread.
+    '''
+
+    def __init__(self, emulator):
+        self.emulator = emulator
+        self.callback = None
+        self.data = None
+        self.last = None
+
+
+    def ignore_types(self, sysex=True, timing=True, active_sense=True):
+        pass
+
+
+    def set_callback(self, callback, data=None):
+        self.callback = callback
+        self.data = data
+
+
+    def cancel_callback(self):
+        self.callback = None
+
+
+    def close_port(self):
+        self.callback = None
+
+
+    def deliver(self, message):
+        now = time.monotonic()
+        delta = now - self.last if self.last is not None else 0.0
+        self.last = now
+        callback = self.callback
+        if callback is not None:
+            callback((message, delta), self.data)
+
+
+class EmulatedMidiOut():
+    '''
+        Stands in for rtmidi.MidiOut, sent bytes go to the emulator.
+    '''
+
+    def __init__(self, emulator, multi_sysex=False):
+        self.emulator = emulator
+        # like rtmidi unless told otherwise: one sysex per send_message
+        self.multi_sysex = multi_sysex
+
+
+    def send_message(self, message):
+        # same restriction as rtmidi: only sysex may be longer than 3 bytes
+        if len(message) > 3 and message[0] != 0xF0:
+            raise ValueError('Message must not be longer than 3 bytes unless it is sysex')
+        self.emulator.receive(message)
+
+
+    def close_port(self):
+        pass
+
+
+class UR44C_emulator():
+    '''
+        Protocol level UR44C: plug midi_in/midi_out into UR44C (or any subclass) and it talks
+        sysex like the hardware.
+
+            emulator = UR44C_emulator(latency=0.003, jitter=0.001, drop_rate=0.01)
+            ur44c = UR44C(emulator.midi_in, emulator.midi_out, settle_time=0)
+
+        - queries are answered with the emulated state (parameter defaults at start)
+        - changes update the state and are echoed back as change messages
+        - meter requests start a stream of `frames` meter frames, `meter_interval` apart,
+          values come from meter_source(frame_no) -> (current, peak)
+        - keepalives are answered, and sent every keepalive_interval seconds if set
+        - a bulk dump (F0 43 00 3E ...) is accepted and counted; the only known one is the
+          initialization dump, so it resets the state to defaults
+        - turn(channel, param, value) simulates a change on the device itself
+
+        Link model: every message to the device and back takes latency + uniform(0, jitter)
+        seconds, is dropped with probability drop_rate and, with bandwidth set, occupies the
+        link for len(message)/bandwidth seconds (bytes per second, each direction).
+        With multi_sysex the output accepts several sysex messages per send_message.
+    '''
+
+    def __init__(self, model='UR44C', latency=0.001, jitter=0.0, drop_rate=0.0, bandwidth=None,
+                 meter_interval=0.02, keepalive_interval=None, meter_source=None, seed=None, multi_sysex=False):
+        self.registry = get_registry(model)
+        self.num_inputs = 6 if model == 'UR44C' else 2
+        self.latency = latency
+        self.jitter = jitter
+        self.drop_rate = drop_rate
+        self.bandwidth = bandwidth
+        self.meter_interval = meter_interval
+        self.keepalive_interval = keepalive_interval
+        self.meter_source = meter_source or self._silence
+        self.random = random.Random(seed)
+
+        self.midi_in = EmulatedMidiIn(self)
+        self.midi_out = EmulatedMidiOut(self, multi_sysex)
+
+        self.state = {}
+        self.reset_state()
+        self.stats = dict.fromkeys(('received', 'sent', 'dropped', 'queries', 'changes', 'keepalives',
+                                    'meter_frames', 'bulk_loads', 'bulk_bytes', 'unknown'), 0)
+
+        self.sysex = None
+        self.uplink_free = 0
+        self.downlink_free = 0
+        self.meter_frames_left = 0
+        self.meter_frame_no = 0
+        self.next_meter = None
+        self.next_keepalive = time.monotonic() + keepalive_interval if keepalive_interval else None
+
+        self.queue = []
+        self.seq = 0
+        self.running = True
+        self.cond = threading.Condition()
+        self.thread = threading.Thread(target=self._run, name='UR44C_emulator', daemon=True)
+        self.thread.start()
+
+
+    def reset_state(self):
+        registry = self.registry
+        defaults = {registry.ids[i]: registry.defaults[i] for i in range(len(registry))}
+        self.state = {(channel, param): value for channel in range(self.num_inputs) for param, value in defaults.items()}
+
+
+    def _silence(self, frame_no):
+        values = [-1270] * protocol.METER_COUNT
+        return values, values
+
+
+    def close(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        self.thread.join()
+
+
+    def _transfer(self, size, link_free, now):
+        # returns when the last byte is through and the link is free again
+        start = max(now, link_free)
+        return start + size / self.bandwidth if self.bandwidth else start
+
+
+    def _send(self, message, earliest):
+        # device -> host, called with self.cond held
+        if self.drop_rate and self.random.random() < self.drop_rate:
+            self.stats['dropped'] += 1
+            return
+        due = earliest + self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0)
+        due = self.downlink_free = self._transfer(len(message), self.downlink_free, due)
+        self.seq += 1
+        heapq.heappush(self.queue, (due, self.seq, message))
+        self.cond.notify_all()
+
+
+    def receive(self, message):
+        '''
+            Bytes from the host. rtmidi may get a sysex in several pieces (SendBulk sends
+            3 byte packets), so they are reassembled first.
+        '''
+        with self.cond:
+            now = time.monotonic()
+            arrival = self.uplink_free = self._transfer(len(message), self.uplink_free, now)
+            for byte in message:
+                if byte == 0xF0:
+                    self.sysex = [byte]
+                elif self.sysex is not None:
+                    self.sysex.append(byte)
+                    if byte == 0xF7:
+                        sysex, self.sysex = self.sysex, None
+                        self._handle(sysex, arrival)
+
+
+    def _handle(self, message, arrival):
+        self.stats['received'] += 1
+        if self.drop_rate and self.random.random() < self.drop_rate:
+            self.stats['dropped'] += 1
+            return
+
+        if len(message) > 3 and message[2] == 0x00 and message[3] == 0x3E:
+            self.stats['bulk_loads'] += 1
+            self.stats['bulk_bytes'] += len(message)
+            self.reset_state()
+            return
+        if len(message) == 10 and message[2] == 0x30 and message[5:7] == [0x02, 0x03]:
+            self.meter_frames_left = message[7]
+            if self.meter_frames_left and self.next_meter is None:
+                self.next_meter = arrival
+                self.cond.notify_all()
+            return
+
+        res = protocol.parse(message)
+        if res.type == 'query-parameter':
+            self.stats['queries'] += 1
+            value = self.state.get((res.channel, res.param), 0)
+            self._send(reply_message(res.channel, res.param, value), arrival)
+        elif res.type == 'change-parameter':
+            self.stats['changes'] += 1
+            self.state[(res.channel, res.param)] = res.value
+            self._send(change_message(res.channel, res.param, res.value), arrival)
+        elif res.type == 'keepalive':
+            self.stats['keepalives'] += 1
+            self._send(KEEPALIVE_MESSAGE, arrival)
+        else:
+            self.stats['unknown'] += 1
+
+
+    def turn(self, channel, param, value):
+        '''
+            A change made on the device (front panel, dspMixFx on another host).
+        '''
+        with self.cond:
+            self.state[(channel, param)] = value
+            self._send(change_message(channel, param, value), time.monotonic())
+
+
+    def _run(self):
+        while True:
+            with self.cond:
+                if not self.running:
+                    return
+                now = time.monotonic()
+                if self.next_meter is not None and now >= self.next_meter:
+                    current, peak = self.meter_source(self.meter_frame_no)
+                    self.meter_frame_no += 1
+                    self.meter_frames_left -= 1
+                    self.stats['meter_frames'] += 1
+                    self._send(meter_message(current, peak), now)
+                    self.next_meter = now + self.meter_interval if self.meter_frames_left > 0 else None
+                if self.next_keepalive is not None and now >= self.next_keepalive:
+                    self._send(KEEPALIVE_MESSAGE, now)
+                    self.next_keepalive = now + self.keepalive_interval
+
+                due = []
+                while self.queue and self.queue[0][0] <= now:
+                    due.append(heapq.heappop(self.queue)[2])
+
+                if not due:
+                    wake = [t for t in (self.next_meter, self.next_keepalive) if t is not None]
+                    if self.queue:
+                        wake.append(self.queue[0][0])
+                    timeout = min(wake) - now if wake else None
+                    self.cond.wait(timeout)
+                    continue
+                self.stats['sent'] += len(due)
+
+            # deliver outside the lock, the callback may send right away
+            for message in due:
+                self.midi_in.deliver(message)
@@ -1,23 +1,40 @@
 import threading
 import time
 
+from URxxx.meters import MeterBuffer
+from URxxx.registry import get_registry
+
 class UR44C_mock():
     def __init__(self):
         self.data = {}
         self.num_inputs = 6
+        self.registry = get_registry()
+        self.meters = MeterBuffer()
 
 
     def SetParameterByName(self, unit, name, value, input=0):
         param_num, min_val, max_val, def_val, val_descr, notes = getattr(unit, name)
         assert min_val <= value <= max_val
         assert 0 <= input <= 5
-        self.data[param_num] = value
+        self.data[(input, param_num)] = value
         return True
 
 
     def GetParameterByName(self, unit, name, input=0):
         param_num, min_val, max_val, def_val, val_descr, notes = getattr(unit, name)
         assert 0 <= input <= 5
-        if param_num not in self.data:
-            self.data[param_num] = def_val
-        return self.data[param_num]
+        if (input, param_num) not in self.data:
+            self.data[(input, param_num)] = def_val
+        return self.data[(input, param_num)]
+
+
+    def GetParameters(self, queries, window=16, check_timeout=3):
+        return {query: self.GetParameterByName(*query) for query in queries}
+
+
+    def SubscribeMeters(self, renew_interval=1.0, frames=0x32):
+        pass
+
+
+    def UnsubscribeMeters(self, stop_stream=True):
+        pass
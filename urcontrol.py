@@ -1,13 +1,95 @@
 #!/usr/bin/env python3
 
 import sys
-import os
 import argparse
-import time
-from ur44c import *
-import utils
+import atexit
 
-import rtmidi
+# Only the parameter registry is imported at startup. rtmidi and the device code are loaded
+# by open_device() for commands that talk to the mixer, so metadata commands start fast.
+from URxxx.registry import get_registry
+
+
+def open_device(args):
+    import utils
+    midi_in, midi_out, model = utils.open_midi_ports(args.midi_in, args.midi_out)
+    return make_device(args, midi_in, midi_out, model)
+
+
+def make_device(args, midi_in, midi_out, model, record=None):
+    from URxxx.ur44c import UR44C
+    from URxxx.ur22c import UR22C
+
+    if 'UR22C' in model:
+        device = UR22C(midi_in, midi_out)
+    else:
+        device = UR44C(midi_in, midi_out)
+    if args.stats:
+        device.EnableStats()
+        atexit.register(print_stats, lambda: device.stats.snapshot())
+    record = record or args.record
+    if record:
+        device.StartRecording(record)
+        atexit.register(device.StopRecording)
+    return device
+
+
+def open_fleet(args):
+    # every attached unit, for --all
+    import utils
+    from URxxx.fleet import Fleet
+    devices = {}
+    for number, ports in enumerate(utils.discover_devices()):
+        midi_in, midi_out, model = utils.find_midi_ports(ports.midi_in_port, ports.midi_out_port)
+        # one log per unit: FILE.0, FILE.1, ...
+        record = f'{args.record}.{number}' if args.record else None
+        devices[ports.name] = make_device(args, midi_in, midi_out, ports.model, record)
+    if not devices:
+        print('Cannot find Steinberg UR device')
+        sys.exit(1)
+    return Fleet(devices)
+
+
+def print_fleet(results, verbose, format=str):
+    # one line per unit, returns True if every unit succeeded
+    ok = True
+    for name, result in results.items():
+        line = f'{name}: {format(result.value)}' if result.ok else f'{name}: ERROR {result.error}'
+        if verbose:
+            line += f' ({result.elapsed*1000:.1f} ms)'
+        print(line)
+        ok = ok and result.ok
+    return ok
+
+
+def open_session(args):
+    # with --socket the commands go through a running daemon instead of the MIDI ports
+    if args.socket:
+        from URxxx.daemon import DaemonClient
+        client = DaemonClient(args.socket)
+        if args.stats:
+            atexit.register(print_stats, client.Stats)
+        return client
+    return open_device(args)
+
+
+def start_heartbeat(args, device):
+    # long running commands survive a replugged interface
+    import utils
+    from URxxx.heartbeat import Heartbeat
+    heartbeat = Heartbeat(device, reopen=lambda: utils.find_midi_ports(args.midi_in, args.midi_out)[:2])
+    if args.verbose:
+        heartbeat.subscribe(lambda old, new: print(f'Link {old} -> {new}', flush=True))
+    heartbeat.start()
+    return heartbeat
+
+
+def print_stats(snapshot):
+    from URxxx.stats import format_stats
+    stats = snapshot()
+    if stats is None:
+        print('Statistics are not enabled', file=sys.stderr)
+    else:
+        print(format_stats(stats, get_registry().names), file=sys.stderr)
 
 
 def main():
@@ -18,83 +100,92 @@ def main():
     parser.add_argument('--midi-out', '-mo', action='store', help='Output MIDI port', metavar='PORT', default='')
     parser.add_argument('--input', '-i', action='store', type=int, metavar='input', help='Input number (for Inputs, default:1)', default=1)
     parser.add_argument('--unit', '-u', action='store', metavar='UNIT', help='Unit name (default:mixer)', default='mixer')
+    parser.add_argument('--all', '-a', action='store_true', help='Apply get/set/snapshot to every attached unit')
+    parser.add_argument('--stats', action='store_true', help='Print message counters and latencies to stderr on exit')
+    parser.add_argument('--record', action='store', metavar='FILE', help='Log the MIDI traffic to FILE (see URxxx.recorder)', default='')
+    parser.add_argument('--socket', '-S', action='store', metavar='SOCKET', help='Use the daemon listening on SOCKET (get/set/reset/batch)', default='')
 
     commands = parser.add_argument_group('Commands')
     command = commands.add_mutually_exclusive_group(required=True)
     command.add_argument('--get-midi-ports', '-m', action='store_true', help='Show MIDI ports in system')
+    command.add_argument('--list-devices', '-ld', action='store_true', help='Show attached units with their paired ports')
     command.add_argument('--list-units', '-lu', action='store_true', help='List unit names')
     command.add_argument('--list-parameters', '-l', action='store_true', help='List available parameters in unit')
     command.add_argument('--get-parameter', '-g', action='store', metavar='PARAMETER', help='Get parameter value')
     command.add_argument('--set-parameter', '-s', action='store', metavar=('PARAMETER', '(VALUE|min|max|def)'), nargs=2, help='Set parameter value')
     command.add_argument('--reset', action='store_true', help='Reset mixer config')
+    command.add_argument('--snapshot', action='store', metavar='FILE', help='Save every parameter of the device to FILE')
+    command.add_argument('--restore', action='store', metavar='FILE', help='Restore device state from FILE (writes only differences)')
+    command.add_argument('--batch', '-b', action='store', metavar='FILE', help='Run get/set/reset commands from FILE (- for stdin) over one device session')
+    command.add_argument('--daemon', action='store', metavar='SOCKET', help='Own the device and serve clients on the Unix socket SOCKET')
+    command.add_argument('--osc', action='store', metavar='[HOST:]PORT', help='Serve OSC over UDP (default host 127.0.0.1)')
+
+    command.add_argument('--decode-capture', action='store', metavar='FILE', help='Print the mixer messages in a usbmon pcap/pcapng capture')
+    command.add_argument('--capture-stats', action='store', metavar='FILE', help='Count the parameters in a usbmon pcap/pcapng capture')
 
     command.add_argument('--test', action='store_true', help=argparse.SUPPRESS)
 
     args = parser.parse_args()
 
-    if args.unit=='mixer':
-        unit = UR44C_Params_Mixer
-    elif args.unit=='chstrip':
-        unit = UR44C_Params_ChStrip
-    elif args.unit=='clean':
-        unit = UR44C_Params_Clean
-    elif args.unit=='crunch':
-        unit = UR44C_Params_Crunch
-    elif args.unit=='lead':
-        unit = UR44C_Params_Lead
-    elif args.unit=='drive':
-        unit = UR44C_Params_Drive
-    elif args.unit=='pitchfix':
-        unit = UR44C_Params_PitchFix
-    elif args.unit=='hall':
-        unit = UR44C_Params_Hall
-    elif args.unit=='room':
-        unit = UR44C_Params_Room
-    elif args.unit=='plate':
-        unit = UR44C_Params_Plate
-    elif args.unit=='delay':
-        unit = UR44C_Params_Delay
-    elif args.unit=='ducker':
-        unit = UR44C_Params_Ducker
-    elif args.unit=='mbcomp':
-        unit = UR44C_Params_MBComp
-    else:
+    registry = get_registry()
+    if args.unit not in registry.units:
         raise Exception('Unit does not exists')
+    unit = registry.units[args.unit]
 
     if args.get_midi_ports:
+        import utils
         utils.print_midi_ports()
+    elif args.list_devices:
+        import utils
+        for ports in utils.discover_devices():
+            print(f'{ports.name:<12} {ports.model:<6} in: {ports.midi_in_port}  out: {ports.midi_out_port}')
     elif args.list_units:
-        print('mixer')
-        print('chstrip')
-        print('clean')
-        print('crunch')
-        print('lead')
-        print('drive')
-        print('pitchfix')
-        print('hall')
-        print('room')
-        print('plate')
-        print('delay')
-        print('ducker')
-        print('mbcomp')
+        for name in registry.units:
+            print(name)
+    elif args.decode_capture:
+        from URxxx import pcap
+        for message in pcap.read_messages(args.decode_capture):
+            parsed = message.parsed
+            arrow = '<-' if message.direction == pcap.INCOMING else '->'
+            fields = ' '.join(f'{name}={value}' for name, value in zip(parsed._fields, parsed) if name != 'data')
+            line = [f'{message.time or 0:.6f}', f'{message.bus}:{message.device}', arrow, parsed.type, fields]
+            if args.verbose:
+                line.append(message.data.hex().upper())
+            print(' '.join(part for part in line if part))
+    elif args.capture_stats:
+        from URxxx import pcap
+        stats = pcap.ParameterStats().update(pcap.read_messages(args.capture_stats))
+        for type, count in sorted(stats.types.items(), key=lambda item: -item[1]):
+            print(f'{type:<20} {count:>10}')
+        print()
+        print('PARAM    COUNT  CHANGES  QUERIES  REPLIES CHANNELS          MIN         MAX NAMES')
+        for entry in stats.most_common():
+            channels = ','.join(str(channel) for channel in sorted(entry.channels))
+            label = ', '.join(f'{unit}.{name}' for unit, name in registry.names(entry.param))
+            print(f'{entry.param:>5} {entry.count:>8} {entry.changes:>8} {entry.queries:>8} {entry.replies:>8} {channels:<12} '
+                  f'{entry.min if entry.min is not None else "":>11} {entry.max if entry.max is not None else "":>11} {label}')
     elif args.list_parameters:
         if args.verbose:
             print('NAME                 MIN.VAL MAX.VAL DEF.VAL   VALUE EXPLAIN                      NOTES')
-        for i in vars(unit):
-            if not i.startswith('__'):
-                if args.verbose:
-                    attr = getattr(unit, i)
-                    print(f'{i:<20} {attr[1]:>7} {attr[2]:>7} {attr[3] if attr[3] is not None else "":>7}   {attr[4]:<35}{attr[5] if attr[5] else ""}')
-                else:
-                    print(i)
+        for i in registry.parameters(unit):
+            name = registry.entries[i][1]
+            if args.verbose:
+                attr = registry.describe(i)
+                print(f'{name:<20} {attr[1]:>7} {attr[2]:>7} {attr[3] if attr[3] is not None else "":>7}   {attr[4]:<35}{attr[5] if attr[5] else ""}')
+            else:
+                print(name)
 
 
+    elif args.get_parameter and args.all:
+        fleet = open_fleet(args)
+        if not print_fleet(fleet.get(args.unit, args.get_parameter, args.input-1), args.verbose):
+            sys.exit(1)
+
     elif args.get_parameter:
-        midi_in, midi_out = open_midi_ports(args.midi_in, args.midi_out)
-        ur44c = UR44C(midi_in, midi_out)
-        value = ur44c.GetParameterByName(unit, args.get_parameter, args.input-1)
+        ur44c = open_session(args)
+        value = ur44c.GetParameterByName(args.unit, args.get_parameter, args.input-1)
         if args.verbose:
-            attr = getattr(unit, args.get_parameter)
+            attr = registry.describe(registry.index(unit, args.get_parameter))
             print(f'{args.get_parameter}  |  {attr[4]}')
             print()
             print(f'CURRENT VALUE: {value}')
@@ -107,34 +198,129 @@ def main():
             print(value)
 
     elif args.set_parameter:
-        midi_in, midi_out = open_midi_ports(args.midi_in, args.midi_out)
-        ur44c = UR44C(midi_in, midi_out)
+        ur44c = open_session(args) if not args.all else None
+        attr = registry.describe(registry.index(unit, args.set_parameter[0]))
         if args.set_parameter[1]=='min':
-            value = getattr(unit, args.set_parameter[0])[1]
+            value = attr[1]
         elif args.set_parameter[1]=='max':
-            value = getattr(unit, args.set_parameter[0])[2]
+            value = attr[2]
         elif args.set_parameter[1]=='def':
-            value = getattr(unit, args.set_parameter[0])[3]
+            value = attr[3]
         else:
             value = int(args.set_parameter[1])
-        result = ur44c.SetParameterByName(unit, args.set_parameter[0], value, args.input-1)
+        if args.all:
+            fleet = open_fleet(args)
+            results = fleet.set(args.unit, args.set_parameter[0], value, args.input-1)
+            if not print_fleet(results, args.verbose, lambda ok: 'OK' if ok else 'FAILED') or not all(r.value for r in results.values()):
+                sys.exit(1)
+            return
+        result = ur44c.SetParameterByName(args.unit, args.set_parameter[0], value, args.input-1)
         if not result:
             print('FAILED')
             sys.exit(1)
 
     elif args.reset:
-        midi_in, midi_out = utils.open_midi_ports(args.midi_in, args.midi_out)
-        ur44c = UR44C(midi_in, midi_out)
-        ur44c.ResetConfig()
+        ur44c = open_session(args)
+        progress = None
+        if args.verbose and not args.socket:
+            progress = lambda sent, total: print(f'\r{sent}/{total} bytes', end='', flush=True)
+        stats = ur44c.ResetConfig(progress)
+        if args.verbose and stats:
+            print()
+            print(f"Sent {stats['bytes']} bytes in {stats['packets']} packets, {stats['elapsed']:.3f}s")
+
+    elif args.snapshot and args.all:
+        import os
+        from URxxx import snapshot
+        fleet = open_fleet(args)
+        results = fleet.snapshot()
+        root, ext = os.path.splitext(args.snapshot)
+        for name, result in results.items():
+            if result.ok:
+                snapshot.save_snapshot(f"{root}-{name.replace(' ', '_')}{ext}", fleet.devices[name].model, result.value)
+        if not print_fleet(results, args.verbose, lambda values: f'{len(values)} parameters'):
+            sys.exit(1)
+
+    elif args.snapshot:
+        from URxxx import snapshot
+        ur44c = open_device(args)
+        values = snapshot.read_snapshot(ur44c)
+        snapshot.save_snapshot(args.snapshot, ur44c.model, values)
+        if args.verbose:
+            print(f'Saved {len(values)} parameters')
+
+    elif args.restore:
+        from URxxx import snapshot
+        ur44c = open_device(args)
+        model, values = snapshot.load_snapshot(args.restore)
+        if model != ur44c.model:
+            print(f'Snapshot is for {model}, device is {ur44c.model}')
+            sys.exit(1)
+        report = snapshot.restore_snapshot(ur44c, values)
+        if args.verbose:
+            print(f"Changed {len(report['changed'])}, unchanged {len(report['unchanged'])}, failed {len(report['failed'])}")
+        if report['failed']:
+            for channel, param in report['failed']:
+                names = ', '.join(f'{unit}.{name}' for unit, name in ur44c.ParameterNames(param))
+                print(f'FAILED: input {channel+1} parameter {param} ({names})')
+            sys.exit(1)
+
+    elif args.batch:
+        from URxxx import commands
+        ur44c = open_session(args)
+        # the daemon parses the commands itself
+        execute = type(ur44c).execute if args.socket else commands.execute
+        if args.batch == '-':
+            ok = commands.run(ur44c, sys.stdin, sys.stdout, execute)
+        else:
+            with open(args.batch) as f:
+                ok = commands.run(ur44c, f, sys.stdout, execute)
+        if not ok:
+            sys.exit(1)
+
+    elif args.daemon:
+        from URxxx.daemon import Daemon
+        ur44c = open_device(args)
+        daemon = Daemon(ur44c, args.daemon)
+        heartbeat = start_heartbeat(args, ur44c)
+        if args.verbose:
+            print(f'Serving {ur44c.model} on {args.daemon}')
+        try:
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            heartbeat.stop()
+            daemon.close()
+
+    elif args.osc:
+        import time
+        from URxxx.osc import OSCBridge
+        host, _, port = args.osc.rpartition(':')
+        ur44c = open_device(args)
+        bridge = OSCBridge(ur44c, (host or '127.0.0.1', int(port)))
+        bridge.start()
+        heartbeat = start_heartbeat(args, ur44c)
+        if args.verbose:
+            print(f'Serving {ur44c.model} OSC on {bridge.address[0]}:{bridge.address[1]}')
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            heartbeat.stop()
+            bridge.close()
 
     elif args.test:
-        midi_in, midi_out = utils.open_midi_ports(args.midi_in, args.midi_out)
-        ur44c = UR44C(midi_in, midi_out)
+        import time
+        ur44c = open_device(args)
+        mixer = get_registry(ur44c.model).units['mixer']
         for i in range(8):
-            ur44c.SetParameterByName(UR44C_Params_Mixer, 'MainMix1Volume', 30, 0)
+            ur44c.SetParameterByName(mixer, 'MainMix1Volume', 30, 0)
             time.sleep(0.2)
 
-            ur44c.SetParameterByName(UR44C_Params_Mixer, 'MainMix1Volume', 103, 0)
+            ur44c.SetParameterByName(mixer, 'MainMix1Volume', 103, 0)
             time.sleep(0.2)
 
 
@@ -1,5 +1,7 @@
 import rtmidi
+import re
 import sys
+from collections import namedtuple
 
 
 def pan2Label(pos):
@@ -42,42 +44,109 @@ def print_midi_ports():
         print(f'  {port}')
 
 
-def open_midi_ports(midi_in_port = None, midi_out_port = None):
+class PortNotFound(Exception):
+    pass
+
+
+# one attached unit, name is unique among the attached units (e.g. "UR44C 20")
+DevicePorts = namedtuple('DevicePorts', 'name model midi_in_port midi_out_port')
+
+# ALSA names ports "client name:port name client:port", e.g.
+# "Steinberg UR44C:Steinberg UR44C MIDI 1 20:0"
+_ALSA_PORT = re.compile(r'^(?P<client>[^:]+):.* (?P<id>\d+):(?P<port>\d+)$')
+_MODEL = re.compile(r'UR\d+C')
+
+
+def _port_device(name):
+    # (device key, port number) of a port name, ports of one unit share the key
+    m = _ALSA_PORT.match(name)
+    if m:
+        return f"{m.group('client')} {m.group('id')}", int(m.group('port'))
+    # other backends name inputs and outputs of a unit alike
+    return name, 0
+
+
+def discover_devices():
+    '''
+        Every attached Steinberg UR unit with its input and output paired by client and its
+        model identified, sorted by name. Like open_midi_ports, the last port of a unit is
+        its control port.
+    '''
+    ports = {}
+    for direction, names in (('in', rtmidi.MidiIn().get_ports()), ('out', rtmidi.MidiOut().get_ports())):
+        for name in names:
+            if 'Steinberg UR' not in name:
+                continue
+            key, number = _port_device(name)
+            ports.setdefault(key, {'in': {}, 'out': {}})[direction][number] = name
+
+    devices = []
+    for key, unit in ports.items():
+        numbers = unit['in'].keys() & unit['out'].keys()
+        if not numbers:
+            continue
+        number = max(numbers)
+        m = _MODEL.search(key)
+        model = m.group(0) if m else ''
+        m = _ALSA_PORT.match(unit['in'][number])
+        name = f"{model} {m.group('id')}" if m and model else key
+        devices.append(DevicePorts(name, model, unit['in'][number], unit['out'][number]))
+    return sorted(devices)
+
+
+def find_midi_ports(midi_in_port = None, midi_out_port = None):
+    '''
+        Open the UR MIDI ports, by name or the first Steinberg UR found.
+        Returns (midi_in, midi_out, model), raises PortNotFound. Used again to reopen the
+        ports after the interface was replugged.
+    '''
+    if not midi_in_port and not midi_out_port:
+        devices = discover_devices()
+        if not devices:
+            raise PortNotFound(f'Cannot find Steinberg UR device')
+        midi_in_port, midi_out_port = devices[0].midi_in_port, devices[0].midi_out_port
+
     midi_in = rtmidi.MidiIn()
+    model = ""
     if midi_in_port:
         try:
             index = midi_in.get_ports().index(midi_in_port)
         except ValueError:
-            print(f'Cannot find input midi port {midi_in_port}')
-            sys.exit(1)
+            raise PortNotFound(f'Cannot find input midi port {midi_in_port}') from None
+        model = midi_in_port.split(':')[0]
     else:
         index = -1
-        model = ""
         for i, v in enumerate(midi_in.get_ports()):
             if 'Steinberg UR' in v:
                 index = i
                 model = v.split(':')[0]
         if index == -1:
-            print(f'Cannot find Steinberg UR device')
-            sys.exit(1)
-    midi_in.open_port(index)
-    midi_in.ignore_types(sysex=False)
+            raise PortNotFound(f'Cannot find Steinberg UR device')
 
     midi_out = rtmidi.MidiOut()
     if midi_out_port:
         try:
-            index = midi_out.get_ports().index(midi_out_port)
+            out_index = midi_out.get_ports().index(midi_out_port)
         except ValueError:
-            print(f'Cannot find output midi port {midi_out_port}')
-            sys.exit(1)
+            raise PortNotFound(f'Cannot find output midi port {midi_out_port}') from None
     else:
-        index = -1
+        out_index = -1
         for i, v in enumerate(midi_out.get_ports()):
             if 'Steinberg UR' in v:
-                index = i
-        if index == -1:
-            print(f'Cannot find Steinberg UR device')
-            sys.exit(1)
-    midi_out.open_port(index)
+                out_index = i
+        if out_index == -1:
+            raise PortNotFound(f'Cannot find Steinberg UR device')
+
+    midi_in.open_port(index)
+    midi_in.ignore_types(sysex=False)
+    midi_out.open_port(out_index)
 
     return midi_in, midi_out, model
+
+
+def open_midi_ports(midi_in_port = None, midi_out_port = None):
+    try:
+        return find_midi_ports(midi_in_port, midi_out_port)
+    except PortNotFound as e:
+        print(e)
+        sys.exit(1)